@@ -0,0 +1,152 @@
+import argparse
+import functools
+import http.client
+import threading
+import time
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+from urllib.parse import urlsplit
+
+from server import KeepAliveHandler, PooledHTTPServer
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def client(host, port, paths, deadline, keep_alive, latencies, errors):
+    connection = None
+    i = 0
+    while time.monotonic() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            if connection is None:
+                connection = http.client.HTTPConnection(host, port, timeout=10)
+            headers = {} if keep_alive else {"Connection": "close"}
+            connection.request("GET", path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            if response.status >= 400:
+                errors.append(response.status)
+            if not keep_alive or response.will_close:
+                connection.close()
+                connection = None
+        except (OSError, http.client.HTTPException) as error:
+            errors.append(error)
+            if connection is not None:
+                connection.close()
+            connection = None
+            continue
+        latencies.append(time.perf_counter() - start)
+    if connection is not None:
+        connection.close()
+
+
+def load(url, paths, concurrency, duration, keep_alive=True):
+    parts = urlsplit(url)
+    deadline = time.monotonic() + duration
+    latencies = []
+    errors = []
+    threads = [
+        threading.Thread(
+            target=client,
+            args=(parts.hostname, parts.port or 80, paths, deadline, keep_alive, latencies, errors),
+        )
+        for _ in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p90_ms": percentile(latencies, 0.90) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+    }
+
+
+def print_result(name, result):
+    print(
+        f"{name:<22} {result['requests']:7d} req {result['errors']:5d} err "
+        f"{result['rps']:9.1f} req/s   p50 {result['p50_ms']:7.2f} ms   "
+        f"p90 {result['p90_ms']:7.2f} ms   p99 {result['p99_ms']:7.2f} ms   "
+        f"max {result['max_ms']:7.2f} ms"
+    )
+
+
+def serve_in_background(httpd):
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    return httpd.server_address[1]
+
+
+def compare(directory, paths, concurrency, duration, workers):
+    # Both servers get the same directory and the same load, one after another
+    legacy = HTTPServer(("127.0.0.1", 0), functools.partial(QuietHandler, directory=directory))
+    pooled = PooledHTTPServer(
+        ("127.0.0.1", 0),
+        functools.partial(KeepAliveHandler, directory=directory),
+        workers,
+        quiet=True,
+    )
+    for name, httpd, keep_alive in [
+        ("single-threaded", legacy, False),
+        (f"pooled x{workers}", pooled, True),
+    ]:
+        port = serve_in_background(httpd)
+        try:
+            result = load(f"http://127.0.0.1:{port}", paths, concurrency, duration, keep_alive)
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+        print_result(name, result)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HTTP load test")
+    parser.add_argument(
+        "--url", type=str, help="Server to load, starts both local servers when omitted", default=None
+    )
+    parser.add_argument(
+        "--dir", type=str, help="Directory the local servers serve", default="./public"
+    )
+    parser.add_argument(
+        "--path", action="append", help="Path to request, can be repeated", default=None
+    )
+    parser.add_argument(
+        "--concurrency", type=int, help="Number of concurrent clients", default=16
+    )
+    parser.add_argument(
+        "--duration", type=float, help="Seconds to run each load for", default=5
+    )
+    parser.add_argument(
+        "--workers", type=int, help="Workers of the pooled local server", default=8
+    )
+    parser.add_argument(
+        "--no-keep-alive", action="store_true", help="Open a new connection per request"
+    )
+    args = parser.parse_args()
+    paths = args.path or ["/", "/index.css", "/majesty/", "/background.png"]
+
+    if args.url:
+        result = load(args.url, paths, args.concurrency, args.duration, not args.no_keep_alive)
+        print_result(args.url, result)
+    else:
+        compare(args.dir, paths, args.concurrency, args.duration, args.workers)
@@ -1,20 +1,388 @@
 import os
 import argparse
+import datetime
+import email.utils
+import hashlib
+import io
+import selectors
+import signal
+import socket
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
 from http.server import HTTPServer, SimpleHTTPRequestHandler
 
+KEEP_ALIVE_TIMEOUT = 5 # Seconds an idle persistent connection is kept open
+FILE_CACHE_BYTES = 64 * 2 ** 20
+MAX_CACHED_FILE_BYTES = 4 * 2 ** 20
+
+
+class CachedFile():
+    __slots__ = ("key", "etag", "body", "mtime")
+
+    def __init__(self, key, etag, body, mtime):
+        self.key = key # (mtime_ns, size, inode) the entry was read at
+        self.etag = etag
+        self.body = body # None when the file is too large to keep in memory
+        self.mtime = mtime
+
+
+class FileCache():
+    def __init__(self, max_bytes=FILE_CACHE_BYTES, max_file_bytes=MAX_CACHED_FILE_BYTES):
+        if max_bytes <= 0:
+            raise ValueError("max_bytes is required to be positive")
+        self.max_bytes = max_bytes
+        self.max_file_bytes = min(max_file_bytes, max_bytes)
+        self.entries = OrderedDict() # path -> CachedFile
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def lookup(self, path):
+        # A stat per request is what notices files rebuilt under --dir
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None and entry.key == key:
+                self.entries.move_to_end(path)
+                return entry
+
+        with open(path, "rb") as file:
+            stat = os.fstat(file.fileno())
+            digest = hashlib.sha256()
+            body = None
+            if stat.st_size <= self.max_file_bytes:
+                body = file.read()
+                digest.update(body)
+            else:
+                for chunk in iter(lambda: file.read(1 << 20), b""):
+                    digest.update(chunk)
+        key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        entry = CachedFile(key, f"\"{digest.hexdigest()[:32]}\"", body, stat.st_mtime)
+
+        with self.lock:
+            previous = self.entries.pop(path, None)
+            if previous is not None and previous.body is not None:
+                self.size -= len(previous.body)
+            self.entries[path] = entry
+            if body is not None:
+                self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                if evicted.body is not None:
+                    self.size -= len(evicted.body)
+        return entry
+
+
+def stat_entry(path):
+    # Without a cache the validator comes from the stat, not the content
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    return CachedFile(key, f"\"{stat.st_mtime_ns:x}-{stat.st_size:x}\"", None, stat.st_mtime)
+
+
+def accepts_encoding(header, encoding):
+    if not header:
+        return False
+    qualities = {}
+    for part in header.split(","):
+        name, _, parameters = part.partition(";")
+        quality = 1.0
+        for parameter in parameters.split(";"):
+            key, _, value = parameter.strip().partition("=")
+            if key.lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.strip().lower()] = quality
+    return qualities.get(encoding, qualities.get("*", 0.0)) > 0
+
+
+def compressed_variant(path):
+    # The build stamps a .gz sibling with the mtime of the file it was made
+    # from, anything else is stale and must not be served
+    try:
+        stat = os.stat(path)
+        gz_stat = os.stat(path + ".gz")
+    except OSError:
+        return None
+    if gz_stat.st_mtime_ns != stat.st_mtime_ns:
+        return None
+    return path + ".gz"
+
+
+class CachingHandler(SimpleHTTPRequestHandler):
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            if not urllib.parse.urlsplit(self.path).path.endswith("/"):
+                return super().send_head()
+            for index in "index.html", "index.htm":
+                index = os.path.join(path, index)
+                if os.path.isfile(index):
+                    path = index
+                    break
+            else:
+                return super().send_head()
+        if path.endswith("/") or not os.path.isfile(path):
+            return super().send_head()
+
+        served_path = path
+        variant = compressed_variant(path)
+        if variant and accepts_encoding(self.headers.get("Accept-Encoding"), "gzip"):
+            served_path = variant
+
+        cache = getattr(self.server, "file_cache", None)
+        try:
+            entry = cache.lookup(served_path) if cache else stat_entry(served_path)
+        except OSError:
+            return super().send_head()
+
+        if self.is_not_modified(entry):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_validators(entry, variant)
+            self.end_headers()
+            return None
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-type", self.guess_type(path))
+        if served_path != path:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(entry.key[1]))
+        self.send_validators(entry, variant)
+        self.end_headers()
+        if entry.body is not None:
+            return io.BytesIO(entry.body)
+        return open(served_path, "rb")
+
+    def copyfile(self, source, outputfile):
+        try:
+            source.fileno()
+        except (AttributeError, io.UnsupportedOperation):
+            # Bodies cached in memory are already in userspace
+            return super().copyfile(source, outputfile)
+        # The kernel moves file pages straight to the socket
+        outputfile.flush()
+        self.connection.sendfile(source)
+
+    def send_validators(self, entry, variant=None):
+        self.send_header("ETag", entry.etag)
+        self.send_header("Last-Modified", self.date_time_string(entry.mtime))
+        if variant:
+            # Shared caches must not hand the gzip body to clients without gzip
+            self.send_header("Vary", "Accept-Encoding")
+        # Browsers may keep the file but have to revalidate it on every use
+        self.send_header("Cache-Control", "no-cache")
+
+    def is_not_modified(self, entry):
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            # If-Modified-Since is ignored whenever If-None-Match is present
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return "*" in tags or any(tag.removeprefix("W/") == entry.etag for tag in tags)
+
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since is None:
+            return False
+        try:
+            since = email.utils.parsedate_to_datetime(if_modified_since)
+        except (TypeError, IndexError, OverflowError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=datetime.timezone.utc)
+        # HTTP dates have a resolution of one second
+        return int(entry.mtime) <= since.timestamp()
+
+
+class KeepAliveHandler(CachingHandler):
+    # HTTP/1.1 keeps connections open unless the client asks otherwise,
+    # every response from SimpleHTTPRequestHandler carries a Content-Length
+    protocol_version = "HTTP/1.1"
+    timeout = KEEP_ALIVE_TIMEOUT
+    # Headers and body go out in separate writes, don't let Nagle hold the body
+    disable_nagle_algorithm = True
+    keep_open = False
+
+    def handle(self):
+        self.keep_open = False
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection:
+            if hasattr(self.server, "park") and not self.has_pending_request():
+                # Hand the idle connection back instead of blocking a worker on it
+                self.keep_open = True
+                return
+            self.handle_one_request()
+
+    def has_pending_request(self):
+        # A non-blocking peek sees both a pipelined request already in the read
+        # buffer and one waiting on the socket, without consuming either
+        self.connection.setblocking(False)
+        try:
+            return bool(self.rfile.peek(1))
+        except OSError:
+            return False
+        finally:
+            self.connection.settimeout(self.timeout)
+
+    def resume(self):
+        try:
+            self.handle()
+        except Exception:
+            self.keep_open = False
+            self.server.handle_error(self.request, self.client_address)
+        if self.keep_open:
+            self.server.park(self)
+        else:
+            self.close()
+
+    def finish(self):
+        if not self.keep_open:
+            super().finish()
+
+    def close(self):
+        self.keep_open = False
+        try:
+            self.finish()
+        finally:
+            self.server.shutdown_request(self.request)
+
+    def log_message(self, format, *args):
+        if not getattr(self.server, "quiet", False):
+            super().log_message(format, *args)
+
+
+class PooledHTTPServer(HTTPServer):
+    request_queue_size = 128
+
+    def __init__(self, server_address, handler_class, workers=8, quiet=False):
+        if workers < 1:
+            raise ValueError("workers is required to be positive")
+        super().__init__(server_address, handler_class)
+        self.quiet = quiet
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="http")
+
+        # Idle keep-alive connections wait in a selector, not on a worker
+        self.selector = selectors.DefaultSelector()
+        self.wakeup_reader, self.wakeup_writer = socket.socketpair()
+        self.selector.register(self.wakeup_reader, selectors.EVENT_READ)
+        self.lock = threading.Lock()
+        self.parking = []
+        self.idle = {} # handler -> time it may be closed at
+        self.closing = False
+        self.idle_thread = threading.Thread(target=self.watch_idle, daemon=True)
+        self.idle_thread.start()
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        handler = None
+        try:
+            handler = self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        if handler is not None and handler.keep_open:
+            self.park(handler)
+        else:
+            self.shutdown_request(request)
+
+    def finish_request(self, request, client_address):
+        return self.RequestHandlerClass(request, client_address, self)
+
+    def park(self, handler):
+        with self.lock:
+            if self.closing:
+                handler.close()
+                return
+            self.parking.append(handler)
+        self.wakeup_writer.send(b"\0")
+
+    def watch_idle(self):
+        while True:
+            events = self.selector.select(timeout=1)
+            with self.lock:
+                if self.closing:
+                    break
+                parking, self.parking = self.parking, []
+            deadline = time.monotonic() + KEEP_ALIVE_TIMEOUT
+            for handler in parking:
+                self.selector.register(handler.connection, selectors.EVENT_READ, handler)
+                self.idle[handler] = deadline
+
+            for key, _ in events:
+                if key.fileobj is self.wakeup_reader:
+                    self.wakeup_reader.recv(4096)
+                    continue
+                self.selector.unregister(key.fileobj)
+                del self.idle[key.data]
+                self.executor.submit(key.data.resume)
+
+            now = time.monotonic()
+            for handler, expires in list(self.idle.items()):
+                if expires <= now:
+                    self.selector.unregister(handler.connection)
+                    del self.idle[handler]
+                    handler.close()
+
+        for handler in list(self.idle) + self.parking:
+            handler.close()
+        self.idle.clear()
+        self.parking = []
+
+    def server_close(self):
+        # Stops accepting and drops idle connections, in-flight requests finish
+        super().server_close()
+        with self.lock:
+            self.closing = True
+        self.wakeup_writer.send(b"\0")
+        self.idle_thread.join()
+        self.executor.shutdown(wait=True)
+        self.selector.close()
+        self.wakeup_reader.close()
+        self.wakeup_writer.close()
+
 
 def run(
     server_class=HTTPServer,
-    handler_class=SimpleHTTPRequestHandler,
+    handler_class=CachingHandler,
     port=8888,
     directory=None,
+    workers=0,
+    cache_size=0,
 ):
     if directory:
         os.chdir(directory)
     server_address = ("", port)
-    httpd = server_class(server_address, handler_class)
-    print(f"Serving HTTP on http://localhost:{port} from directory '{directory}'...")
-    httpd.serve_forever()
+    if workers:
+        if server_class is HTTPServer:
+            server_class = PooledHTTPServer
+        if handler_class is CachingHandler:
+            handler_class = KeepAliveHandler
+        httpd = server_class(server_address, handler_class, workers)
+    else:
+        httpd = server_class(server_address, handler_class)
+    if cache_size:
+        httpd.file_cache = FileCache(cache_size)
+
+    def stop(signum, frame):
+        # shutdown() waits for serve_forever() to return, so it can't run on
+        # the thread that is serving
+        threading.Thread(target=httpd.shutdown).start()
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    mode = f"{workers} workers" if workers else "single-threaded"
+    print(f"Serving HTTP on http://localhost:{port} from directory '{directory}' ({mode})...")
+    try:
+        httpd.serve_forever()
+    finally:
+        httpd.server_close()
+        print("Server stopped")
 
 
 if __name__ == "__main__":
@@ -25,6 +393,18 @@ if __name__ == "__main__":
     parser.add_argument(
         "--port", type=int, help="Port to serve HTTP on", default=8888
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Serve concurrently with HTTP/1.1 keep-alive on this many threads, 0 keeps the single-threaded server",
+        default=0,
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        help="MiB of file contents to keep in memory and answer conditional GETs from, 0 disables",
+        default=0,
+    )
     args = parser.parse_args()
 
-    run(port=args.port, directory=args.dir)
+    run(port=args.port, directory=args.dir, workers=args.workers, cache_size=args.cache_size * 2 ** 20)
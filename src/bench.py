@@ -0,0 +1,224 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+
+import build
+import main
+from corpus import generate_markdown, generate_site
+from htmlnode import markdown_to_html_node
+from rendercache import RenderCache
+from textnode import text_to_text_nodes
+
+FORMAT_VERSION = 2 # 2: builds run through main(), full_build has a cold render cache
+PAGE_OPTIONS = ("blocks", "inline_density", "list_length", "code_every", "code_length")
+
+
+def summarize(samples, number=1):
+    # samples are seconds per call
+    return {
+        "number": number,
+        "repeat": len(samples),
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    }
+
+
+def time_function(function, repeat):
+    timer = timeit.Timer(function)
+    # Enough calls per sample that timer resolution doesn't matter, this
+    # also warms up caches before the first sample
+    number, _ = timer.autorange()
+    samples = [total / number for total in timer.repeat(repeat, number)]
+    return summarize(samples, number)
+
+
+def time_build(setup, build, repeat):
+    samples = []
+    # The first round only warms up imports, the page cache and the template
+    for i in range(repeat + 1):
+        setup()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            build()
+            elapsed = time.perf_counter() - start
+        if i:
+            samples.append(elapsed)
+    return summarize(samples)
+
+
+def micro_benchmarks(options, repeat):
+    rng = random.Random(options["seed"])
+    page_options = {key: options[key] for key in PAGE_OPTIONS}
+    markdown = generate_markdown(rng, **page_options)
+    lines = [line for line in markdown.split("\n") if line and line[0] not in "#`>- "]
+    node = markdown_to_html_node(markdown)
+
+    def inline():
+        for line in lines:
+            text_to_text_nodes(line)
+
+    return {
+        "text_to_text_nodes": time_function(inline, repeat),
+        "markdown_to_html_node": time_function(lambda: markdown_to_html_node(markdown), repeat),
+        "to_html": time_function(node.to_html, repeat),
+        "markdown_to_html": time_function(lambda: markdown_to_html_node(markdown).to_html(), repeat),
+    }
+
+
+def macro_benchmarks(options, repeat):
+    results = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            page_options = {key: options[key] for key in PAGE_OPTIONS}
+            generate_site(
+                "./static",
+                options["pages"],
+                options["fan_out"],
+                options["depth"],
+                options["seed"],
+                **page_options,
+            )
+
+            # Builds run through main() exactly as the command line runs them
+            jobs = ["--jobs", str(options["jobs"])]
+
+            def clean():
+                build.block_cache.clear()
+
+            def cold():
+                # Every page rendered, like the first build on a machine
+                clean()
+                RenderCache(main.RENDER_CACHE_PATH).clear()
+
+            results["full_build"] = time_build(cold, lambda: main.main(jobs), repeat)
+            results["cached_full_build"] = time_build(clean, lambda: main.main(jobs), repeat)
+            # The first incremental build renders everything, later ones nothing
+            with contextlib.redirect_stdout(io.StringIO()):
+                main.main(["--incremental"] + jobs)
+            results["noop_incremental_build"] = time_build(clean, lambda: main.main(["--incremental"] + jobs), repeat)
+        finally:
+            os.chdir(cwd)
+    return results
+
+
+def git_revision():
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip()
+
+
+def run(options):
+    results = {}
+    if options["suite"] in ("all", "micro"):
+        results.update(micro_benchmarks(options, options["repeat"]))
+    if options["suite"] in ("all", "macro"):
+        results.update(macro_benchmarks(options, options["repeat"]))
+    return {
+        "version": FORMAT_VERSION,
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "options": options,
+        "results": results,
+    }
+
+
+def print_report(report, baseline=None):
+    previous = baseline["results"] if baseline else {}
+    for name, result in report["results"].items():
+        line = (
+            f"{name:<24} min {result['min'] * 1000:10.3f} ms   "
+            f"median {result['median'] * 1000:10.3f} ms   "
+            f"stdev {result['stdev'] * 1000:8.3f} ms"
+        )
+        if name in previous:
+            # Medians are less sensitive to a single noisy sample than means
+            ratio = result["median"] / previous[name]["median"]
+            line += f"   {ratio:5.2f}x baseline"
+        print(line)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the markdown to HTML pipeline")
+    parser.add_argument(
+        "--suite", choices=("all", "micro", "macro"), default="all", help="Benchmarks to run"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=7, help="Samples per benchmark"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="Seed of the synthetic corpus"
+    )
+    parser.add_argument(
+        "--pages", type=int, default=200, help="Pages in the synthetic site"
+    )
+    parser.add_argument(
+        "--fan-out", type=int, default=4, help="Subdirectories per directory"
+    )
+    parser.add_argument(
+        "--depth", type=int, default=2, help="Levels of subdirectories"
+    )
+    parser.add_argument(
+        "--blocks", type=int, default=40, help="Blocks per page"
+    )
+    parser.add_argument(
+        "--inline-density", type=float, default=0.2, help="Chance of a word being inline markup"
+    )
+    parser.add_argument(
+        "--list-length", type=int, default=4, help="Items per list"
+    )
+    parser.add_argument(
+        "--code-every", type=int, default=10, help="Every how many blocks a code fence is, 0 disables"
+    )
+    parser.add_argument(
+        "--code-length", type=int, default=6, help="Lines per code fence"
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=1, help="Processes the builds render with"
+    )
+    parser.add_argument(
+        "--output", type=str, default=None, help="Write the results to this JSON file"
+    )
+    parser.add_argument(
+        "--baseline", type=str, default=None, help="JSON file of an earlier run to compare with"
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.repeat < 1:
+        raise ValueError("repeat is required to be positive")
+    options = {key: value for key, value in vars(args).items() if key not in ("output", "baseline")}
+    report = run(options)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+            file.write("\n")
+        print(f"Wrote {args.output}", file=sys.stderr)
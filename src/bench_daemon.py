@@ -0,0 +1,76 @@
+import argparse
+import io
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from client import SOCKET_PATH, request
+from corpus import generate_site
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+CLIENT = os.path.join(SRC_DIR, "client.py")
+DAEMON = os.path.join(SRC_DIR, "daemon.py")
+
+
+def edit_page(path, number):
+    with open(path, "a") as file:
+        file.write(f"\n\nEdited in round {number}.\n")
+
+
+def time_builds(site_dir, page, rounds, argv):
+    # Wall time of the client process, from start-up to its exit, for an
+    # incremental build after a single-page change
+    samples = []
+    for i in range(rounds):
+        edit_page(page, i)
+        start = time.perf_counter()
+        subprocess.run([sys.executable, CLIENT, *argv], cwd=site_dir, check=True, stdout=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def report(name, samples):
+    print(
+        f"{name:<6} median {statistics.median(samples) * 1000:8.1f} ms   "
+        f"min {min(samples) * 1000:8.1f} ms   max {max(samples) * 1000:8.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold versus warm latency of a single-page rebuild")
+    parser.add_argument("--pages", type=int, default=200, help="Pages in the generated site")
+    parser.add_argument("--rounds", type=int, default=10, help="Timed rebuilds per mode")
+    args = parser.parse_args()
+
+    argv = ["--incremental"]
+    with tempfile.TemporaryDirectory() as site_dir:
+        generate_site(os.path.join(site_dir, "static"), pages=args.pages)
+        page = os.path.join(site_dir, "static", "content", "index.md")
+        subprocess.run([sys.executable, CLIENT, *argv], cwd=site_dir, check=True, stdout=subprocess.DEVNULL)
+
+        # Without a daemon the client builds in its own fresh interpreter
+        cold = time_builds(site_dir, page, args.rounds, argv)
+
+        daemon = subprocess.Popen([sys.executable, DAEMON], cwd=site_dir, stdout=subprocess.DEVNULL)
+        socket_path = os.path.join(site_dir, SOCKET_PATH)
+        try:
+            while request({"ping": True}, socket_path) is None:
+                time.sleep(0.05)
+            # Untimed, fills the daemon's caches like the first cold build did
+            time_builds(site_dir, page, 1, argv)
+            warm = time_builds(site_dir, page, args.rounds, argv)
+        finally:
+            request({"stop": True}, socket_path, io.StringIO())
+            daemon.wait()
+
+    print(f"Rebuilding 1 of {args.pages} pages, {args.rounds} rounds")
+    report("cold", cold)
+    report("warm", warm)
+    print(f"speedup {statistics.median(cold) / statistics.median(warm):.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import io
+import sys
+import timeit
+
+from htmlnode import ParentNode, LeafNode
+
+
+def concat_to_html(node):
+    # The recursive string concatenation to_html used before serialize_html
+    if isinstance(node, LeafNode):
+        return node.to_html()
+
+    result = ""
+    for child in node.children:
+        result += concat_to_html(child)
+
+    if not node.props:
+        return f"<{node.tag}>{result}</{node.tag}>"
+    return f"<{node.tag} {node.props_to_html()}>{result}</{node.tag}>"
+
+
+def wide_document(sections, paragraphs):
+    children = []
+    for i in range(sections):
+        section = []
+        for j in range(paragraphs):
+            section.append(ParentNode("p", [
+                LeafNode(None, f"Paragraph {j} of section {i} with "),
+                LeafNode("b", "bold"),
+                LeafNode(None, " and "),
+                LeafNode("a", "a link", {"href": f"/section/{i}#{j}"}),
+            ]))
+        children.append(ParentNode("section", section, {"id": f"section-{i}"}))
+    return ParentNode("div", children)
+
+
+def deep_document(depth, width):
+    node = ParentNode("div", [LeafNode(None, "x" * 80) for _ in range(width)])
+    for i in range(depth):
+        node = ParentNode("div", [LeafNode("span", f"level {i}"), node])
+    return node
+
+
+def measure(function, repeat=5):
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+
+def report(name, node):
+    concat = measure(lambda: concat_to_html(node))
+    streamed = measure(lambda: node.to_html())
+    written = measure(lambda: node.write_html(io.StringIO()))
+    print(
+        f"{name:<28} concat {concat * 1000:9.2f} ms   "
+        f"to_html {streamed * 1000:9.2f} ms   "
+        f"write_html {written * 1000:9.2f} ms   "
+        f"speedup {concat / streamed:5.2f}x"
+    )
+
+
+def main():
+    sys.setrecursionlimit(10000)
+    report("wide 200x100", wide_document(200, 100))
+    report("deep 500 levels", deep_document(500, 10))
+    report("deep 2000 levels", deep_document(2000, 10))
+    report("deep 4000 levels, wide leaf", deep_document(4000, 5000))
+
+
+if __name__ == "__main__":
+    main()
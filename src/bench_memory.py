@@ -0,0 +1,93 @@
+import gc
+import resource
+import sys
+import time
+import tracemalloc
+
+from htmlnode import ParentNode, LeafNode, markdown_to_html_node
+from textnode import TextNode, TextType
+
+
+class DictTextNode():
+    # TextNode as it was before __slots__, for comparison
+    def __init__(self, text, text_type, url=None):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+
+class DictHTMLNode():
+    # HTMLNode as it was before __slots__, for comparison
+    def __init__(self, tag=None, value=None, children=None, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = children
+        self.props = props
+
+
+def bytes_per_node(factory, count=100000):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    nodes = [factory(i) for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # The list holding the nodes isn't part of the node cost
+    return (after - before - sys.getsizeof(nodes)) / count
+
+
+def corpus(paragraphs):
+    lines = ["# Benchmark corpus", ""]
+    for i in range(paragraphs):
+        lines.append(
+            f"Paragraph {i} has **bold**, *italic*, `code` and a [link](/page/{i}) "
+            f"plus an ![image](/image/{i}.png) in the middle of plain prose."
+        )
+        lines.append("")
+        if i % 10 == 0:
+            lines.append(f"## Section {i}")
+            lines.append("- first point")
+            lines.append("- second point")
+            lines.append("")
+    return "\n".join(lines)
+
+
+def count_nodes(node):
+    count = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        count += 1
+        if node.children:
+            stack.extend(node.children)
+    return count
+
+
+def main():
+    text = "x" * 16
+    rows = [
+        ("TextNode", lambda i: TextNode(text, TextType.BOLD)),
+        ("TextNode (__dict__)", lambda i: DictTextNode(text, TextType.BOLD)),
+        ("LeafNode", lambda i: LeafNode("b", text)),
+        ("LeafNode (__dict__)", lambda i: DictHTMLNode("b", text)),
+        ("ParentNode", lambda i: ParentNode("p", [])),
+        ("ParentNode (__dict__)", lambda i: DictHTMLNode("p", None, [])),
+    ]
+    for name, factory in rows:
+        print(f"{name:<24} {bytes_per_node(factory):7.1f} bytes per node")
+
+    paragraphs = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    markdown = corpus(paragraphs)
+    start = time.perf_counter()
+    node = markdown_to_html_node(markdown)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is reported in kilobytes on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(
+        f"corpus {len(markdown) / 2 ** 20:.1f} MiB -> {count_nodes(node)} nodes "
+        f"in {elapsed:.2f} s, peak RSS {peak:.1f} MiB"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import mapped
+from build import write_page
+from corpus import TEMPLATE, generate_markdown
+from rendercache import RenderCache
+
+# How each child reads the source:
+#   read    the whole file into a string, rendered through the render cache,
+#           what a default build did for every page
+#   stream  line by line from the text file, what --no-cache did
+#   mmap    line by line from the mapped file
+MODES = ("read", "stream", "mmap")
+
+
+def write_large_page(path, size, seed=0):
+    rng = random.Random(seed)
+    with open(path, "w") as file:
+        file.write("# Reference\n\n")
+        while file.tell() < size:
+            # Every chunk starts with its own title, which renders as a heading
+            file.write(generate_markdown(rng, blocks=200))
+            file.write("\n\n")
+
+
+def peak_rss():
+    # Kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform != "darwin" else peak // 1024
+
+
+def child(mode, source, template_path, public_dir):
+    before = peak_rss()
+    mapped.MMAP_THRESHOLD = 0 if mode == "mmap" else os.path.getsize(source) + 1
+    cache = RenderCache(os.path.join(public_dir, "cache")) if mode == "read" else None
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        write_page(source, template_path, public_dir, cache)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"before": before, "peak": peak_rss(), "seconds": elapsed}))
+
+
+def measure(mode, source, template_path, public_dir):
+    # A fresh interpreter per mode, peak RSS only ever goes up
+    output = subprocess.run(
+        [sys.executable, __file__, "--child", mode, source, template_path, public_dir],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak RSS of rendering one large page")
+    parser.add_argument("--size", type=int, default=64, help="Size of the generated page in MiB")
+    parser.add_argument("--child", nargs=4, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "reference.md")
+        template_path = os.path.join(directory, "template.html")
+        with open(template_path, "w") as file:
+            file.write(TEMPLATE)
+        write_large_page(source, args.size * 2 ** 20)
+        print(f"Rendering a {os.path.getsize(source) / 2 ** 20:.1f} MiB page")
+        for mode in MODES:
+            public_dir = tempfile.mkdtemp(dir=directory)
+            result = measure(mode, source, template_path, public_dir)
+            growth = (result["peak"] - result["before"]) / 1024
+            print(
+                f"{mode:<8} peak RSS {result['peak'] / 1024:9.1f} MiB   "
+                f"growth {growth:9.1f} MiB   {result['seconds']:7.2f} s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import re
+import timeit
+
+from textnode import (
+    INLINE_MARKUP_PATTERN,
+    TextNode,
+    TextType,
+    extract_markdown_images,
+    extract_markdown_links,
+    text_to_text_nodes,
+)
+
+
+def scan_text_to_text_nodes(text):
+    # text_to_text_nodes before its fast path, plain text took one search
+    if INLINE_MARKUP_PATTERN.search(text) is None:
+        return [TextNode(text, TextType.TEXT)]
+    return text_to_text_nodes(text)
+
+
+def findall_images(text):
+    # extract_markdown_images as it was before the pattern was compiled
+    return re.findall(r"!\[(.*?)\]\((.*?)\)", text)
+
+
+def findall_links(text):
+    return re.findall(r"\[(.*?)\]\((.*?)\)", text)
+
+
+def prose(words):
+    sentence = "The road goes ever on and on, down from the door where it began. "
+    return (sentence * (words // 14 + 1))[:words * 5]
+
+
+def measure(function, repeat=5, number=10000):
+    return min(timeit.repeat(function, number=number, repeat=repeat)) / number
+
+
+def report(name, old, new):
+    before = measure(old)
+    after = measure(new)
+    print(
+        f"{name:<36} before {before * 1e6:9.3f} us   "
+        f"after {after * 1e6:9.3f} us   speedup {before / after:6.2f}x"
+    )
+
+
+def main():
+    marked = prose(60) + " with **bold** and a [link](/page)"
+    for words in 10, 60, 400:
+        plain = prose(words)
+        report(
+            f"text_to_text_nodes, {words} plain words",
+            lambda: scan_text_to_text_nodes(plain),
+            lambda: text_to_text_nodes(plain),
+        )
+    report("extract_markdown_images", lambda: findall_images(marked), lambda: extract_markdown_images(marked))
+    report("extract_markdown_links", lambda: findall_links(marked), lambda: extract_markdown_links(marked))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+import html
+import io
+import itertools
+import os
+import shutil
+
+from discover import discover, load_index, save_index
+from htmlnode import block_entry_size, parse_markdown
+from lru import LRUCache
+from manifest import Manifest, load_manifest, save_manifest, hash_file
+from mapped import is_large, iter_mapped_lines, map_file
+from publish import is_asset, publish_file
+from search import PageText
+from template import load_template
+
+BLOCK_CACHE_SIZE = 32 * 2 ** 20 # Characters of rendered HTML and visible text
+
+# Shared by every page rendered in this process, so repeated boilerplate
+# blocks and unchanged blocks of an edited page are only rendered once
+block_cache = LRUCache(BLOCK_CACHE_SIZE, block_entry_size)
+
+
+def build_incremental(
+    static_dir,
+    template_path,
+    public_dir,
+    manifest_path,
+    jobs=1,
+    cache=None,
+    link=False,
+    index_path=None,
+    collectors=(),
+):
+    if not os.path.exists(static_dir):
+        raise ValueError("static_dir doesn't exist")
+    if not os.path.exists(template_path):
+        raise ValueError("template_path doesn't exist")
+
+    old = load_manifest(manifest_path)
+    if old is None or not os.path.exists(public_dir):
+        # Without a manifest we can't tell stale outputs apart, start clean
+        if os.path.exists(public_dir):
+            shutil.rmtree(public_dir)
+        old = Manifest()
+        for collector in collectors:
+            collector.clear()
+    new = Manifest(hash_file(template_path))
+
+    # Directory listings that haven't changed since the last build are reused
+    previous = load_index(index_path) if index_path else None
+    index = discover(static_dir, public_dir, template_path, previous)
+    expected_dirs = {os.path.normpath(public_dir)}
+    for directory in index.directories:
+        expected_dirs.add(os.path.normpath(public_path(directory, static_dir, public_dir)))
+    for directory in sorted(expected_dirs):
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+    for path in index.assets:
+        digest = hash_file(path)
+        output = public_path(path, static_dir, public_dir)
+        new.assets[path] = {"hash": digest, "output": output}
+        previous = old.assets.get(path)
+        if previous and previous["hash"] == digest and os.path.exists(output):
+            continue
+        publish_file(path, output, link)
+
+    template_changed = new.template != old.template
+    names = sorted(collector.name for collector in collectors)
+    pages = []
+    for path, dest_path in index.pages:
+        digest = hash_file(path)
+        output = page_output_path(path, dest_path)
+        previous = old.pages.get(path)
+        # A collector may hold an older version of the page if the page
+        # changed in a build that collector didn't take part in
+        if (
+            not template_changed and
+            previous and
+            previous["hash"] == digest and
+            previous["output"] == output and
+            os.path.exists(output) and
+            all(path in collector and collector.name in previous.get("collectors", ()) for collector in collectors)
+        ):
+            new.pages[path] = {"hash": digest, "output": output, "collectors": previous.get("collectors", [])}
+            continue
+        new.pages[path] = {"hash": digest, "output": output, "collectors": names}
+        pages.append((path, dest_path))
+    generate_pages(pages, template_path, jobs, cache, collectors)
+
+    for output in old.outputs() - new.outputs():
+        if os.path.isfile(output):
+            print(f"Removing stale output {output}")
+            os.remove(output)
+        if os.path.isfile(f"{output}.gz"):
+            os.remove(f"{output}.gz")
+    for root, _, _ in os.walk(public_dir, topdown=False):
+        if os.path.normpath(root) not in expected_dirs and not os.listdir(root):
+            os.rmdir(root)
+
+    for collector in collectors:
+        for path in old.pages.keys() - new.pages.keys():
+            collector.remove(path)
+        collector.save(index)
+    save_manifest(new, manifest_path)
+    if index_path:
+        save_index(index, index_path)
+    return new
+
+
+def find_pages_r(dir_path_content, dest_dir_path):
+    pages = []
+    files = os.listdir(dir_path_content)
+    for file in files:
+        path = os.path.join(dir_path_content, file)
+        if os.path.isfile(path) and file.endswith(".md"):
+            pages.append((path, dest_dir_path))
+        elif os.path.isdir(path):
+            if "content" not in path:
+                dest_path = os.path.join(dest_dir_path, file)
+                pages.extend(find_pages_r(path, dest_path))
+            else:
+                pages.extend(find_pages_r(path, dest_dir_path))
+    return pages
+
+
+def generate_pages_r(dir_path_content, template_path, dest_dir_path, jobs=1, cache=None):
+    if not os.path.exists(dir_path_content):
+        raise ValueError("dir_path_content doesn't exist")
+    if not os.path.exists(template_path):
+        raise ValueError("template_path doesn't exist")
+    if not os.path.exists(dest_dir_path):
+        raise ValueError("dest_dir_path doesn't exist")
+
+    pages = find_pages_r(dir_path_content, dest_dir_path)
+    generate_pages(pages, template_path, jobs, cache)
+
+
+def generate_pages(pages, template_path, jobs=1, cache=None, collectors=()):
+    if jobs <= 1 or len(pages) < 2:
+        for path, dest_path in pages:
+            document = generate_page(path, template_path, dest_path, cache, bool(collectors))
+            for collector in collectors:
+                collector.add(path, page_output_path(path, dest_path), document)
+        return
+
+    # Imported here, it is most of the start-up time of a serial build
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Several pages per work unit so pickling and IPC don't dominate small pages
+    chunksize = max(1, len(pages) // (jobs * 4))
+    executor = ProcessPoolExecutor(max_workers=jobs)
+    try:
+        results = executor.map(
+            write_page,
+            [path for path, _ in pages],
+            itertools.repeat(template_path),
+            [dest_path for _, dest_path in pages],
+            itertools.repeat(cache),
+            itertools.repeat(bool(collectors)),
+            chunksize=chunksize,
+        )
+        # Results come back in discovery order, so logs and the first
+        # reported error are the same as for a serial build
+        for path, dest_path in pages:
+            print(f"Generating page from {path} to {dest_path} using {template_path}")
+            document = next(results)
+            for collector in collectors:
+                collector.add(path, page_output_path(path, dest_path), document)
+    except BaseException:
+        executor.shutdown(wait=True, cancel_futures=True)
+        raise
+    executor.shutdown()
+
+
+def generate_page(from_path, template_path, dest_path, cache=None, index_text=False, profile=None):
+    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+    return write_page(from_path, template_path, dest_path, cache, index_text, profile)
+
+
+def write_page(from_path, template_path, dest_path, cache=None, index_text=False, profile=None):
+    template = load_template(template_path)
+
+    # Stream into a temporary file so a failing page never leaves partial output
+    output_path = page_output_path(from_path, dest_path)
+    temp_path = f"{output_path}.{os.getpid()}.tmp"
+    # Text and links are taken from the blocks as they are rendered, in the
+    # same worker, the page is never parsed a second time
+    page_text = PageText() if index_text else None
+    try:
+        if is_large(from_path):
+            # Never held as one string, and too large for the render cache
+            with map_file(from_path) as mapped, open(temp_path, "w") as file:
+                title, content, fields = parse_markdown(iter_mapped_lines(mapped), block_cache, page_text, profile)
+                template.render_to(file, page_context(template, title, content, fields), profile)
+        else:
+            with open(from_path) as source, open(temp_path, "w") as file:
+                if cache is None:
+                    title, content, fields = parse_markdown(source, block_cache, page_text, profile)
+                else:
+                    title, content, fields = render_cached(source.read(), cache, page_text, profile)
+                template.render_to(file, page_context(template, title, content, fields), profile)
+        os.replace(temp_path, output_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    if page_text is None:
+        return None
+    return page_text.document(title, fields)
+
+
+def render_cached(markdown, cache, page_text=None, profile=None):
+    key = cache.key(markdown)
+    entry = cache.get(key)
+    if entry is not None:
+        title, content, fields, text = entry
+        if page_text is None:
+            return title, content, fields
+        if text is not None:
+            page_text.load(text)
+            return title, content, fields
+        # Cached before anything collected its text, rendered once more to
+        # store it too
+
+    title, node, fields = parse_markdown(io.StringIO(markdown), block_cache, page_text, profile)
+    content = node.to_html()
+    cache.put(key, title, content, fields, page_text.to_dict() if page_text is not None else None)
+    return title, content, fields
+
+
+def page_context(template, title, content, fields):
+    # Front-matter fields fill the template's other placeholders. Field names
+    # are lowercased, so a lowercase placeholder the page has no field for
+    # renders empty instead of showing up in the page
+    context = {name: "" for name in template.placeholders if name.islower()}
+    context.update((name, html.escape(value)) for name, value in fields.items())
+    context["Title"] = title
+    context["Content"] = content
+    return context
+
+
+def page_output_path(from_path, dest_path):
+    file_name = from_path.split("/")[-1][:-3] + ".html"
+    return os.path.join(dest_path, file_name)
+
+
+def public_path(path, static_dir="./static", public_dir="./public"):
+    # Only the leading static_dir is swapped, "static" further down is part
+    # of a file or directory name
+    if path != static_dir and not path.startswith(static_dir + os.sep):
+        raise ValueError("path is required to be inside static_dir")
+    return public_dir + path[len(static_dir):]
+
+
+def copy_index(index, static_dir, public_dir, link=False):
+    if os.path.exists(public_dir):
+        shutil.rmtree(public_dir)
+    os.mkdir(public_dir)
+    for directory in index.directories:
+        os.mkdir(public_path(directory, static_dir, public_dir))
+    for path in index.assets:
+        publish_file(path, public_path(path, static_dir, public_dir), link)
+
+
+def copy_r(directory, template_path=None, link=False):
+    if not os.path.exists(directory):
+        raise ValueError("directory doesn't exist")
+
+    if directory == "./static":
+        if not os.path.exists("./public"):
+            os.mkdir("./public")
+        else:
+            shutil.rmtree("./public")
+            os.mkdir("./public")
+    else:
+        temp = public_path(directory)
+        if not os.path.exists(temp):
+            os.mkdir(temp)
+
+    files = os.listdir(directory)
+    for file in files:
+        path = os.path.join(directory, file)
+        if os.path.isfile(path):
+            if is_asset(path, template_path):
+                publish_file(path, public_path(path), link)
+        else:
+            copy_r(path, template_path, link)
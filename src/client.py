@@ -0,0 +1,48 @@
+import json
+import os
+import socket
+import sys
+
+# Nothing of the generator itself is imported unless the build runs in this
+# process, talking to the daemon costs little more than interpreter start-up
+
+SOCKET_PATH = "./.cache/build.sock"
+# Builds that never finish run in the client's own process
+IN_PROCESS_FLAGS = ("--watch",)
+
+
+def request(message, socket_path=SOCKET_PATH, output=None):
+    # Writes the daemon's output as it arrives, returns the exit status or
+    # None when no daemon is listening
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(socket_path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        client.close()
+        return None
+
+    output = output if output is not None else sys.stdout
+    with client, client.makefile("rb") as file:
+        client.sendall(json.dumps(message).encode() + b"\n")
+        for line in file:
+            reply = json.loads(line)
+            if "status" in reply:
+                return reply["status"]
+            output.write(reply["output"])
+            output.flush()
+    raise ConnectionError("build daemon closed the connection")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not any(flag in argv for flag in IN_PROCESS_FLAGS):
+        status = request({"argv": argv, "cwd": os.getcwd()})
+        if status is not None:
+            sys.exit(status)
+
+    from main import main as build_in_process
+    build_in_process(argv)
+
+
+if __name__ == "__main__":
+    main()
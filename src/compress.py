@@ -0,0 +1,66 @@
+import gzip
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+COMPRESSIBLE_EXTENSIONS = (".html", ".htm", ".css", ".js", ".json", ".svg", ".txt", ".xml", ".md")
+COMPRESSION_LEVEL = 9
+
+
+def is_compressible(path):
+    return path.endswith(COMPRESSIBLE_EXTENSIONS)
+
+
+def is_up_to_date(path):
+    # The .gz sibling carries the mtime of the file it was made from
+    try:
+        return os.stat(path + ".gz").st_mtime_ns == os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def compress_file(path):
+    with open(path, "rb") as file:
+        stat = os.fstat(file.fileno())
+        data = file.read()
+    # mtime=0 keeps the output identical for identical input
+    compressed = gzip.compress(data, COMPRESSION_LEVEL, mtime=0)
+
+    gz_path = path + ".gz"
+    if len(compressed) >= len(data):
+        # Not worth a second request path, serve the original
+        if os.path.exists(gz_path):
+            os.remove(gz_path)
+        return False
+
+    temp_path = f"{gz_path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(compressed)
+    os.utime(temp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    os.replace(temp_path, gz_path)
+    return True
+
+
+def precompress(paths, jobs=1):
+    paths = [path for path in paths if is_compressible(path) and not is_up_to_date(path)]
+    if not paths:
+        return 0
+    # zlib releases the GIL while compressing, threads are enough
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        return sum(executor.map(compress_file, paths))
+
+
+def precompress_r(directory, jobs=1):
+    if not os.path.exists(directory):
+        raise ValueError("directory doesn't exist")
+
+    paths = []
+    for root, _, files in os.walk(directory):
+        for file in files:
+            path = os.path.join(root, file)
+            if file.endswith(".gz"):
+                # Only siblings made here, assets may be gzip files themselves
+                if is_compressible(path[:-3]) and not os.path.exists(path[:-3]):
+                    os.remove(path)
+            else:
+                paths.append(path)
+    return precompress(paths, jobs)
@@ -0,0 +1,122 @@
+import os
+import random
+
+TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>{{ Title }}</title>
+    <link href="/index.css" rel="stylesheet">
+</head>
+<body>
+    <article>{{ Content }}</article>
+</body>
+</html>
+"""
+STYLESHEET = "body { font-family: sans-serif; }\n"
+WORDS = (
+    "the", "of", "and", "ring", "king", "road", "shadow", "river", "mountain",
+    "forest", "tower", "light", "stone", "journey", "council", "fellowship",
+    "return", "north", "west", "gate", "horse", "song", "dark", "old", "long",
+)
+
+
+def words(rng, count):
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def inline_text(rng, count, density):
+    # density is the chance that a word is replaced by a span of markup
+    parts = []
+    for i in range(count):
+        if rng.random() >= density:
+            parts.append(rng.choice(WORDS))
+            continue
+        kind = rng.randrange(5)
+        text = words(rng, rng.randint(1, 3))
+        if kind == 0:
+            parts.append(f"**{text}**")
+        elif kind == 1:
+            parts.append(f"*{text}*")
+        elif kind == 2:
+            parts.append(f"`{text}`")
+        elif kind == 3:
+            parts.append(f"[{text}](/{rng.choice(WORDS)}/{i})")
+        else:
+            parts.append(f"![{text}](/images/{rng.choice(WORDS)}.png)")
+    return " ".join(parts)
+
+
+def generate_markdown(
+    rng,
+    blocks=40,
+    inline_density=0.2,
+    list_length=4,
+    code_every=10,
+    code_length=6,
+):
+    lines = [f"# {words(rng, 3).title()}", ""]
+    for i in range(blocks):
+        if code_every and i % code_every == code_every - 1:
+            lines.append("```")
+            lines.extend(f"    {words(rng, 6)}" for _ in range(code_length))
+            lines.append("```")
+        else:
+            kind = rng.randrange(6)
+            if kind == 0:
+                lines.append(f"{'#' * rng.randint(2, 4)} {words(rng, 4).title()}")
+            elif kind == 1:
+                lines.append(f"> {inline_text(rng, 16, inline_density)}")
+            elif kind == 2:
+                lines.extend(f"- {inline_text(rng, 8, inline_density)}" for _ in range(list_length))
+            elif kind == 3:
+                # Ordered lists only support single digits
+                count = min(list_length, 9)
+                lines.extend(
+                    f"{n}. {inline_text(rng, 8, inline_density)}" for n in range(1, count + 1)
+                )
+            else:
+                lines.append(inline_text(rng, 40, inline_density))
+        lines.append("")
+    return "\n".join(lines)
+
+
+def site_directories(fan_out, depth):
+    directories = [""]
+    level = [""]
+    for _ in range(depth):
+        level = [
+            os.path.join(parent, f"section-{i}")
+            for parent in level
+            for i in range(fan_out)
+        ]
+        directories.extend(level)
+    return directories
+
+
+def generate_site(static_dir, pages=100, fan_out=4, depth=2, seed=0, **options):
+    # The same arguments always write the same site, byte for byte
+    if pages < 1:
+        raise ValueError("pages is required to be positive")
+    rng = random.Random(seed)
+    os.makedirs(os.path.join(static_dir, "content"), exist_ok=True)
+    with open(os.path.join(static_dir, "template.html"), "w") as file:
+        file.write(TEMPLATE)
+    with open(os.path.join(static_dir, "index.css"), "w") as file:
+        file.write(STYLESHEET)
+
+    directories = site_directories(fan_out, depth)
+    paths = []
+    for i in range(pages):
+        directory = directories[i % len(directories)]
+        name = "index.md" if i < len(directories) else f"page-{i}.md"
+        if directory:
+            path = os.path.join(static_dir, directory, name)
+        else:
+            # Pages directly under content end up in the site root
+            path = os.path.join(static_dir, "content", name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(generate_markdown(rng, **options))
+        paths.append(path)
+    return paths
@@ -0,0 +1,110 @@
+import argparse
+import contextlib
+import json
+import os
+import socketserver
+import sys
+import threading
+import traceback
+
+import main
+from client import SOCKET_PATH, request
+
+# One JSON object per line in both directions. The client sends
+# {"argv": [...], "cwd": ...}, {"ping": true} or {"stop": true}, the daemon
+# answers with any number of {"output": text} and a final {"status": code}.
+
+
+class SocketWriter():
+    # Stands in for stdout and stderr while a build runs, output reaches the
+    # client as it is printed
+    def __init__(self, file):
+        self.file = file
+
+    def write(self, text):
+        if text:
+            self.file.write(json.dumps({"output": text}).encode() + b"\n")
+        return len(text)
+
+    def flush(self):
+        self.file.flush()
+
+
+def run_build(argv, writer):
+    # The interpreter, parsed modules, block and template caches, directory
+    # listings and file hashes all stay warm between builds
+    with contextlib.redirect_stdout(writer), contextlib.redirect_stderr(writer):
+        try:
+            main.main(argv)
+        except SystemExit as error:
+            if error.code is None or isinstance(error.code, int):
+                return error.code or 0
+            print(error.code, file=sys.stderr)
+            return 1
+        except Exception:
+            traceback.print_exc()
+            return 1
+    return 0
+
+
+class BuildHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        message = json.loads(self.rfile.readline())
+        writer = SocketWriter(self.wfile)
+        if message.get("ping"):
+            status = 0
+        elif message.get("stop"):
+            writer.write("Stopping build daemon\n")
+            status = 0
+            # shutdown() waits for serve_forever(), which runs this handler
+            threading.Thread(target=self.server.shutdown).start()
+        elif message.get("cwd") != os.getcwd():
+            writer.write(f"The build daemon serves {os.getcwd()}\n")
+            status = 2
+        else:
+            status = run_build(message["argv"], writer)
+        self.wfile.write(json.dumps({"status": status}).encode() + b"\n")
+
+
+def serve(socket_path=SOCKET_PATH):
+    if os.path.exists(socket_path):
+        if request({"ping": True}, socket_path) is not None:
+            raise ValueError("a build daemon is already listening on socket_path")
+        # Left behind by a daemon that didn't exit cleanly
+        os.remove(socket_path)
+    directory = os.path.dirname(socket_path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+
+    with socketserver.UnixStreamServer(socket_path, BuildHandler) as server:
+        print(f"Serving builds on {socket_path}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(socket_path)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Keep the static site generator warm between builds")
+    parser.add_argument(
+        "--socket",
+        default=SOCKET_PATH,
+        help="Unix socket to listen on",
+    )
+    parser.add_argument(
+        "--stop",
+        action="store_true",
+        help="Stop the daemon listening on the socket",
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.stop:
+        if request({"stop": True}, args.socket) is None:
+            print("No build daemon is running")
+    else:
+        serve(args.socket)
@@ -0,0 +1,120 @@
+import json
+import os
+import time
+
+from publish import is_asset
+
+INDEX_VERSION = 1
+# A directory changed this recently might change again within the same
+# mtime tick, its listing isn't trusted on the next run
+RACY_SECONDS = 2
+
+_loaded = {} # path -> (mtime_ns, size, SiteIndex) of indexes loaded or saved by this process
+
+
+class SiteIndex():
+    def __init__(self, directories=None, assets=None, pages=None, templates=None):
+        self.directories = directories if directories is not None else [] # Below the root
+        self.assets = assets if assets is not None else []
+        self.pages = pages if pages is not None else [] # (source, dest dir)
+        self.templates = templates if templates is not None else []
+        self.listings = {} # directory -> {"mtime_ns", "entries"}, what is persisted
+        self.scanned = 0 # Directories listed instead of taken from the last index
+
+    def __repr__(self):
+        return (
+            f"SiteIndex({len(self.pages)} pages, {len(self.assets)} assets, "
+            f"{len(self.directories)} directories)"
+        )
+
+    def to_dict(self):
+        return {"version": INDEX_VERSION, "directories": self.listings}
+
+
+def scan_directory(directory):
+    # DirEntry knows the file type from the directory listing itself, no
+    # stat per entry unless it is a symlink
+    entries = []
+    with os.scandir(directory) as iterator:
+        for entry in iterator:
+            if entry.is_file():
+                entries.append((entry.name, False))
+            elif entry.is_dir():
+                entries.append((entry.name, True))
+    return entries
+
+
+def discover(static_dir, public_dir, template_path=None, previous=None):
+    if not os.path.isdir(static_dir):
+        raise ValueError("static_dir doesn't exist")
+
+    listings = previous.listings if previous is not None else {}
+    index = SiteIndex()
+    now = time.time_ns()
+
+    def visit(directory, dest_path, mtime_ns):
+        cached = listings.get(directory)
+        if cached is not None and cached["mtime_ns"] == mtime_ns:
+            entries = cached["entries"]
+        else:
+            entries = scan_directory(directory)
+            index.scanned += 1
+        if now - mtime_ns > RACY_SECONDS * 10 ** 9:
+            index.listings[directory] = {"mtime_ns": mtime_ns, "entries": entries}
+
+        for name, is_dir in entries:
+            path = os.path.join(directory, name)
+            if is_dir:
+                index.directories.append(path)
+                # Pages in content directories end up in the parent's output
+                if "content" not in path:
+                    sub_dest_path = os.path.join(dest_path, name)
+                else:
+                    sub_dest_path = dest_path
+                visit(path, sub_dest_path, os.stat(path).st_mtime_ns)
+            elif name.endswith(".md"):
+                index.pages.append((path, dest_path))
+            elif is_asset(path, template_path):
+                index.assets.append(path)
+            else:
+                index.templates.append(path)
+
+    visit(static_dir, public_dir, os.stat(static_dir).st_mtime_ns)
+    return index
+
+
+def load_index(path):
+    # Like the manifest, a missing or unreadable index only costs a full scan
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    cached = _loaded.get(path)
+    if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    try:
+        with open(path) as file:
+            data = json.load(file)
+        if data.get("version") != INDEX_VERSION:
+            return None
+        index = SiteIndex()
+        for directory, listing in data["directories"].items():
+            entries = [(name, is_dir) for name, is_dir in listing["entries"]]
+            index.listings[directory] = {"mtime_ns": listing["mtime_ns"], "entries": entries}
+    except (OSError, TypeError, ValueError, KeyError, AttributeError):
+        return None
+    _loaded[path] = (stat.st_mtime_ns, stat.st_size, index)
+    return index
+
+
+def save_index(index, path):
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as file:
+        json.dump(index.to_dict(), file, sort_keys=True)
+    os.replace(temp_path, path)
+    # The next build in this process doesn't have to read it back
+    stat = os.stat(path)
+    _loaded[path] = (stat.st_mtime_ns, stat.st_size, index)
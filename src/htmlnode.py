@@ -1,8 +1,16 @@
 from enum import Enum
+import io
+import itertools
 
 from textnode import TextNode, TextType, text_to_text_nodes
 
 
+# Bump whenever a change to parsing alters the rendered HTML
+PARSER_VERSION = 3
+
+HEADING_TAGS = ("h1", "h2", "h3", "h4", "h5", "h6")
+
+
 class BlockType(Enum):
     PARAGRAPH = 1
     HEADING = 2
@@ -13,6 +21,9 @@ class BlockType(Enum):
 
 
 class HTMLNode():
+    # Pages allocate a node per inline span, so skip the per-instance __dict__
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag # Without a tag will render as raw text
         self.value = value # Without a value will be assumed to have children
@@ -22,16 +33,21 @@ class HTMLNode():
     def to_html(self):
         raise NotImplementedError()
 
+    def write_html(self, file, profile=None):
+        # Streams the serialized node into anything with a write method
+        if profile is None:
+            serialize_html(self, file.write)
+            return
+        with profile.stage("to_html"):
+            serialize_html(self, file.write, profile)
+
     def props_to_html(self):
         if not isinstance(self.props, dict):
             raise TypeError("props is required to be a dictionary")
         if not self.props:
             raise ValueError("props is required to be populated")
 
-        result = ""
-        for key, value in self.props.items():
-            result += f"{key}=\"{value}\" "
-        return result.rstrip()
+        return " ".join([f"{key}=\"{value}\"" for key, value in self.props.items()])
 
     def __repr__(self):
         result = ""
@@ -52,25 +68,46 @@ class HTMLNode():
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag=None, children=None, props=None):
         super().__init__(tag, None, children, props)
 
     def to_html(self):
+        result = []
+        serialize_html(self, result.append)
+        return "".join(result)
+
+    def start_tag(self):
         if not self.tag:
             raise ValueError("tag is required")
         if not self.children:
             raise ValueError("children is required to be populated")
 
-        result = ""
-        for child in self.children:
-            result += child.to_html()
-
         if not self.props:
-            return f"<{self.tag}>{result}</{self.tag}>"
-        return f"<{self.tag} {self.props_to_html()}>{result}</{self.tag}>"
-            
+            return f"<{self.tag}>"
+        return f"<{self.tag} {self.props_to_html()}>"
+
+
+class StreamedNode(ParentNode):
+    # Its children come from an iterator that parses the document while the
+    # node is written out, so it can only be serialized once
+    __slots__ = ("serialized",)
+
+    def __init__(self, tag=None, children=None, props=None):
+        super().__init__(tag, children, props)
+        self.serialized = False
+
+    def start_tag(self):
+        if self.serialized:
+            raise ValueError("streamed node can only be serialized once")
+        self.serialized = True
+        return super().start_tag()
+
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag=None, value=None, props=None):
         super().__init__(tag, value, None, props)
 
@@ -86,15 +123,91 @@ class LeafNode(HTMLNode):
         return f"<{self.tag} {self.props_to_html()}>{self.value}</{self.tag}>"
 
 
+def serialize_html(node, write, profile=None):
+    # Walks the tree with an explicit stack instead of recursion, so deeply
+    # nested documents neither copy strings per level nor hit the recursion limit.
+    # With a profile, nodes are counted and writes are timed apart
+    if profile is not None:
+        write = profile.timed_call(write, "write")
+    stack = []
+    children = iter((node,))
+    end_tag = ""
+    while True:
+        for child in children:
+            if profile is not None:
+                profile.count("nodes")
+            if isinstance(child, ParentNode):
+                write(child.start_tag())
+                stack.append((children, end_tag))
+                children = iter(child.children)
+                end_tag = f"</{child.tag}>"
+                break
+            write(child.to_html())
+        else:
+            write(end_tag)
+            if not stack:
+                return
+            children, end_tag = stack.pop()
+
+
 def markdown_to_html_node(markdown):
-    blocks = markdown_to_blocks(markdown)[1:]
+    _, blocks = split_front_matter(iter_blocks(io.StringIO(markdown)))
+    next(blocks, None)
+    return ParentNode("div", list(iter_block_nodes(blocks)))
+
+
+def parse_markdown(lines, block_cache=None, page_text=None, profile=None):
+    # Reads the front matter and title and lazily parses the rest of the
+    # document in one pass while the returned StreamedNode is serialized.
+    # page_text is handed the visible text and links of every block as it
+    # is rendered, it is complete once the node has been serialized. profile
+    # times reading lines apart from turning blocks into nodes
+    if profile is not None:
+        lines = profile.timed(lines, "read")
+    fields, blocks = split_front_matter(iter_blocks(lines))
+    title = title_from_block(next(blocks, ""))
+    if page_text is not None:
+        page_text.add_text(title)
+    nodes = iter_block_nodes(blocks, block_cache, page_text, profile)
+    if profile is not None:
+        nodes = profile.timed(nodes, "markdown_to_blocks")
+    first = next(nodes, None)
+    if first is None:
+        return title, ParentNode("div", []), fields
+    return title, StreamedNode("div", itertools.chain((first,), nodes)), fields
+
+
+def iter_block_nodes(blocks, block_cache=None, page_text=None, profile=None):
     is_code_block = False
+    tokenize = text_to_text_nodes
+    if profile is not None:
+        tokenize = profile.timed_call(text_to_text_nodes, "tokenize")
 
-    children = []
+    # Lists and code blocks keep growing until a block starts another node
+    current = None
     for block in blocks:
+        if profile is not None:
+            profile.count("blocks")
         block_type = block_to_block_type(block)
+        node = None
+        # Lines inside a fence are code, whatever they look like
+        if is_code_block or block_type is BlockType.CODE:
+            if is_code_block and block != "```":
+                current.children[0].children.append(
+                    LeafNode(value=block + "\n")
+                )
+                if page_text is not None:
+                    page_text.add_text(block)
+            elif current is None or current.tag != "pre":
+                node = ParentNode("pre", [
+                    ParentNode("code", [])
+                ])
+
+            if block == "```":
+                is_code_block = not is_code_block
+
         # Might have bugs if count excedes 6
-        if block_type is BlockType.HEADING:
+        elif block_type is BlockType.HEADING:
             count = 0
             for ch in block:
                 if ch == "#":
@@ -104,71 +217,75 @@ def markdown_to_html_node(markdown):
             if count > 6:
                 count = 6
 
-            text_nodes = text_to_text_nodes(block[count + 1:])
-            heading = ParentNode(f"h{count}", [])
-            for text_node in text_nodes:
-                heading.children.append(text_node_to_html_node(text_node))
-            children.append(heading)
-
-        elif block_type is BlockType.CODE or is_code_block:
-            if is_code_block and block != "```":
-                children[-1].children[0].children.append(
-                    LeafNode(value=block + "\n")
-                )
-            elif children[-1].tag != "pre":
-                code_block = ParentNode("pre", [
-                    ParentNode("code", [])
-                ])
-                children.append(code_block)
-
-            if block == "```":
-                is_code_block = not is_code_block
+            node = block_node(HEADING_TAGS[count - 1], block[count + 1:], block_type, block, block_cache, page_text, tokenize)
 
         elif block_type is BlockType.QUOTE:
-            text_nodes = text_to_text_nodes(block[1:].strip())
-            quote = ParentNode("blockquote", [])
-            for text_node in text_nodes:
-                quote.children.append(text_node_to_html_node(text_node))
-            children.append(quote)
-            
+            node = block_node("blockquote", block[1:].strip(), block_type, block, block_cache, page_text, tokenize)
+
         elif block_type is BlockType.UNORDERED_LIST:
-            text_nodes = text_to_text_nodes(block[2:])
-            if children[-1].tag == "ul":
-                point = ParentNode("li", [])
-                for text_node in text_nodes:
-                    point.children.append(text_node_to_html_node(text_node))
-                children[-1].children.append(point)
+            point = block_node("li", block[2:], block_type, block, block_cache, page_text, tokenize)
+            if current is not None and current.tag == "ul":
+                current.children.append(point)
             else:
-                point = ParentNode("ul", [
-                    ParentNode("li", [])
-                ])
-                for text_node in text_nodes:
-                    point.children[-1].children.append(text_node_to_html_node(text_node))
-                children.append(point)
-                
+                node = ParentNode("ul", [point])
+
         # Won't work if ordered list goes beyond single digits
         elif block_type is BlockType.ORDERED_LIST:
-            text_nodes = text_to_text_nodes(block[2:])
-            if children[-1].tag == "ol":
-                point = ParentNode("li", [])
-                for text_node in text_nodes:
-                    point.children.append(text_node_to_html_node(text_node))
-                children[-1].children.append(point)
+            point = block_node("li", block[2:], block_type, block, block_cache, page_text, tokenize)
+            if current is not None and current.tag == "ol":
+                current.children.append(point)
             else:
-                point = ParentNode("ol", [
-                    ParentNode("li", [])
-                ])
-                for text_node in text_nodes:
-                    point.children[0].children.append(text_node_to_html_node(text_node))
-                children.append(point)
+                node = ParentNode("ol", [point])
 
         elif block_type is BlockType.PARAGRAPH:
-            text_nodes = text_to_text_nodes(block)
-            paragraph = ParentNode("p", [])
-            for text_node in text_nodes:
-                paragraph.children.append(text_node_to_html_node(text_node))
-            children.append(paragraph)
-    return ParentNode("div", children)
+            node = block_node("p", block, block_type, block, block_cache, page_text, tokenize)
+
+        if node is not None:
+            if current is not None:
+                yield current
+            current = node
+
+    if current is not None:
+        yield current
+
+
+def block_node(tag, text, block_type, block, block_cache=None, page_text=None, tokenize=text_to_text_nodes):
+    if block_cache is None:
+        text_nodes = tokenize(text)
+        if page_text is not None:
+            page_text.add_block(block_type, *text_and_links(text_nodes))
+        return ParentNode(tag, [text_node_to_html_node(text_node) for text_node in text_nodes])
+
+    # Only single-block elements are memoized, list wrappers and code blocks
+    # are still assembled per page from their (memoized) items and lines.
+    # Entries are (html, text, links), a cached block still tells page_text
+    # what it says and where it points
+    key = (block_type, block)
+    entry = block_cache.get(key)
+    if entry is None:
+        text_nodes = tokenize(text)
+        html = ParentNode(tag, [text_node_to_html_node(text_node) for text_node in text_nodes]).to_html()
+        entry = (html, *text_and_links(text_nodes))
+        block_cache.put(key, entry)
+    if page_text is not None:
+        page_text.add_block(block_type, entry[1], entry[2])
+    return LeafNode(None, entry[0])
+
+
+def block_entry_size(entry):
+    html, text, _ = entry
+    return len(html) + len(text)
+
+
+def text_and_links(text_nodes):
+    # What a reader sees of the block, and where its links and images point
+    links = []
+    for text_node in text_nodes:
+        if text_node.text_type is TextType.LINK:
+            links.append(("link", text_node.url))
+        elif text_node.text_type is TextType.IMAGE:
+            links.append(("image", text_node.url))
+    return "".join(text_node.text for text_node in text_nodes), tuple(links)
 
 
 def block_to_block_type(block):
@@ -188,14 +305,41 @@ def block_to_block_type(block):
 
 
 def markdown_to_blocks(markdown):
-    result = [x.strip() for x in markdown.split("\n")]
-    return [x for x in filter(lambda x: x != "", result)]
+    return list(iter_blocks(markdown.split("\n")))
+
+
+def iter_blocks(lines):
+    for line in lines:
+        block = line.strip()
+        if block:
+            yield block
+
+
+def split_front_matter(blocks):
+    # Optional "key: value" lines between two "---" lines above the title,
+    # returns the fields and the blocks after them
+    first = next(blocks, "")
+    if first != "---":
+        return {}, itertools.chain((first,), blocks)
+    fields = {}
+    for block in blocks:
+        if block == "---":
+            return fields, blocks
+        key, separator, value = block.partition(":")
+        if not separator:
+            raise Exception("front matter is required to be key: value lines")
+        fields[key.strip().lower()] = value.strip()
+    raise Exception("front matter is missing its closing ---")
 
 
 def extract_title(markdown):
-    title = markdown_to_blocks(markdown)[0]
-    if title.startswith("# "):
-        return title[2:]
+    _, blocks = split_front_matter(iter_blocks(io.StringIO(markdown)))
+    return title_from_block(next(blocks, ""))
+
+
+def title_from_block(block):
+    if block.startswith("# "):
+        return block[2:]
     else:
         raise Exception("h1 header is required")
 
@@ -0,0 +1,174 @@
+import json
+import os
+import urllib.parse
+
+from build import page_output_path, public_path
+from publish import page_url, write_json
+
+LINKS_VERSION = 1
+BACKLINKS_FILE = "backlinks.json" # Inside the public directory
+
+
+def resolve(url, base_url):
+    # Path of the page or asset an internal link points at, None for links
+    # that leave the site or stay on the same page
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme or parts.netloc or not parts.path:
+        return None
+    return urllib.parse.urljoin(base_url, urllib.parse.unquote(parts.path))
+
+
+def site_targets(index, static_dir, public_dir, outputs=()):
+    # Every URL that reaches a page or asset -> the URL it is listed under.
+    # outputs are files written by the build that no source maps to
+    targets = {}
+    pages = [page_output_path(path, dest_path) for path, dest_path in index.pages]
+    for output_path in pages + list(outputs):
+        url = page_url(output_path, public_dir)
+        targets[url] = url
+        if url.endswith("/"):
+            # The server answers both, redirecting the one without a slash
+            targets[url + "index.html"] = url
+            if url != "/":
+                targets[url[:-1]] = url
+    for path in index.assets:
+        url = page_url(public_path(path, static_dir, public_dir), public_dir)
+        targets[url] = url
+    return targets
+
+
+class LinkGraph():
+    name = "links"
+    def __init__(self, static_dir, public_dir, state_path=None):
+        self.static_dir = static_dir
+        self.public_dir = public_dir
+        self.state_path = state_path
+        self.generators = [] # Collectors whose outputs() can be linked to, saved before this one
+        self.clear()
+
+    def clear(self):
+        self.urls = [] # id -> URL, every URL is stored once
+        self.ids = {} # URL -> id
+        self.pages = {} # source -> {"url": id, "links": [[kind, target id], ...]}
+        self.targets = {} # Ids of every page and asset URL of the last check -> canonical id
+        self.broken = {} # source -> [[kind, target id], ...]
+        self.dirty = set() # Sources whose links have to be checked again
+
+    def __repr__(self):
+        return f"LinkGraph({len(self.pages)} pages, {len(self.urls)} URLs)"
+
+    def __contains__(self, source):
+        return source in self.pages
+
+    def intern(self, url):
+        url_id = self.ids.get(url)
+        if url_id is None:
+            url_id = len(self.urls)
+            self.urls.append(url)
+            self.ids[url] = url_id
+        return url_id
+
+    def add(self, source, output_path, document):
+        url = page_url(output_path, self.public_dir)
+        links = []
+        for kind, href in document["links"]:
+            target = resolve(href, url)
+            if target is not None:
+                links.append([kind, self.intern(target)])
+        self.pages[source] = {"url": self.intern(url), "links": links}
+        self.dirty.add(source)
+
+    def remove(self, source):
+        self.pages.pop(source, None)
+        self.broken.pop(source, None)
+        self.dirty.discard(source)
+
+    def backlinks(self):
+        # Pages linking to each target, under the URL the target is listed as
+        result = {}
+        for entry in self.pages.values():
+            for _, target in entry["links"]:
+                target = self.targets.get(target, target)
+                result.setdefault(target, set()).add(entry["url"])
+        return result
+
+    def check(self, index):
+        # index is the SiteIndex of the build that just ran, the site isn't
+        # walked again
+        outputs = [path for generator in self.generators for path in generator.outputs()]
+        targets = {
+            self.intern(url): self.intern(canonical)
+            for url, canonical in site_targets(index, self.static_dir, self.public_dir, outputs).items()
+        }
+        # Links into pages or assets that appeared or went away may have
+        # changed their answer even where the linking page didn't change
+        changed = targets.keys() ^ self.targets.keys()
+        if changed:
+            for source, entry in self.pages.items():
+                if any(target in changed for _, target in entry["links"]):
+                    self.dirty.add(source)
+        self.targets = targets
+
+        for source in self.dirty:
+            entry = self.pages.get(source)
+            if entry is None:
+                continue
+            broken = [link for link in entry["links"] if link[1] not in targets]
+            if broken:
+                self.broken[source] = broken
+            else:
+                self.broken.pop(source, None)
+        checked = len(self.dirty)
+        self.dirty = set()
+        return checked
+
+    def report(self):
+        lines = []
+        for source in sorted(self.broken):
+            for kind, target in self.broken[source]:
+                lines.append(f"Broken {kind} in {source}: {self.urls[target]}")
+        return lines
+
+    def save(self, index):
+        checked = self.check(index)
+        for line in self.report():
+            print(line)
+        count = sum(len(links) for links in self.broken.values())
+        print(f"Checked links of {checked} pages, {count} broken")
+
+        backlinks = {
+            self.urls[target]: sorted(self.urls[source] for source in sources)
+            for target, sources in self.backlinks().items()
+        }
+        write_json(os.path.join(self.public_dir, BACKLINKS_FILE), backlinks)
+        if self.state_path:
+            write_json(self.state_path, self.to_dict())
+
+    def to_dict(self):
+        return {
+            "version": LINKS_VERSION,
+            "urls": self.urls,
+            "pages": self.pages,
+            "targets": sorted(self.targets.items()),
+            "broken": self.broken,
+        }
+
+
+def load_link_graph(static_dir, public_dir, state_path):
+    graph = LinkGraph(static_dir, public_dir, state_path)
+    # Like the search index, state without its output is from another build
+    if not os.path.exists(os.path.join(public_dir, BACKLINKS_FILE)):
+        return graph
+    try:
+        with open(state_path) as file:
+            data = json.load(file)
+        if data.get("version") != LINKS_VERSION:
+            return graph
+        graph.urls = data["urls"]
+        graph.ids = {url: url_id for url_id, url in enumerate(graph.urls)}
+        graph.pages = data["pages"]
+        graph.targets = dict(data["targets"])
+        graph.broken = data["broken"]
+    except (OSError, TypeError, ValueError, KeyError):
+        return LinkGraph(static_dir, public_dir, state_path)
+    return graph
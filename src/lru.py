@@ -0,0 +1,57 @@
+from collections import OrderedDict
+
+
+class LRUCache():
+    def __init__(self, max_size, sizeof=None):
+        if max_size <= 0:
+            raise ValueError("max_size is required to be positive")
+        self.max_size = max_size
+        self.sizeof = sizeof # Without sizeof every entry counts as one
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __repr__(self):
+        return f"LRUCache({len(self.entries)} entries, {self.size}/{self.max_size})"
+
+    def get(self, key, default=None):
+        try:
+            value = self.entries[key][0]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        size = self.sizeof(value) if self.sizeof else 1
+        if size > self.max_size:
+            # Would evict everything else and still not fit
+            return
+
+        if key in self.entries:
+            self.size -= self.entries.pop(key)[1]
+        self.entries[key] = (value, size)
+        self.size += size
+        while self.size > self.max_size:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.size -= evicted
+
+    def pop(self, key, default=None):
+        if key not in self.entries:
+            return default
+        value, size = self.entries.pop(key)
+        self.size -= size
+        return value
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
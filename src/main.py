@@ -1,75 +1,247 @@
+import argparse
 import os
-import shutil
+import sys
 
-from htmlnode import markdown_to_html_node, extract_title
+from build import build_incremental, copy_index, generate_pages
+from discover import discover
+from rendercache import RenderCache
+from search import load_search_index
 
-def main():
-    copy_r("./static")
-    generate_pages_r("./static", "./static/template.html", "./public")
+MANIFEST_PATH = "./.cache/manifest.json"
+INDEX_PATH = "./.cache/index.json"
+SEARCH_STATE_PATH = "./.cache/search.json"
+LINKS_STATE_PATH = "./.cache/links.json"
+METADATA_STATE_PATH = "./.cache/metadata.json"
+RENDER_CACHE_PATH = "./.cache/render"
 
 
-def generate_pages_r(dir_path_content, template_path, dest_dir_path):
-    if not os.path.exists(dir_path_content):
-        raise ValueError("dir_path_content doesn't exist")
-    if not os.path.exists(template_path):
-        raise ValueError("template_path doesn't exist")
-    if not os.path.exists(dest_dir_path):
-        raise ValueError("dest_dir_path doesn't exist")
+def main(argv=None):
+    args = parse_args(argv)
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count()
+    cache = None
+    if args.clear_cache:
+        RenderCache(RENDER_CACHE_PATH).clear()
+    if not args.no_cache:
+        cache = RenderCache(RENDER_CACHE_PATH)
 
-    files = os.listdir(dir_path_content)
-    for file in files:
-        path = os.path.join(dir_path_content, file)
-        if os.path.isfile(path) and file.endswith(".md"):
-            generate_page(path, template_path, dest_dir_path)
-        elif os.path.isdir(path):
-            if "content" not in path:
-                dest_path = os.path.join(dest_dir_path, file)
-                generate_pages_r(path, template_path, dest_path)
-            else:
-                generate_pages_r(path, template_path, dest_dir_path)
+    # Collectors are handed what every rendered page contains
+    collectors = []
+    if args.search:
+        collectors.append(load_search_index("./public", SEARCH_STATE_PATH))
+    metadata = None
+    if args.metadata:
+        from metadata import load_site_metadata
+        metadata = load_site_metadata(
+            "./public",
+            "./static/template.html",
+            args.base_url,
+            METADATA_STATE_PATH,
+        )
+        collectors.append(metadata)
+    links = None
+    if args.check_links:
+        from links import load_link_graph
+        links = load_link_graph("./static", "./public", LINKS_STATE_PATH)
+        # Checked last, once the pages metadata writes exist
+        if metadata is not None:
+            links.generators.append(metadata)
+        collectors.append(links)
 
+    if args.profile or args.pstats or args.trace:
+        from profiler import profile_build
+        profile_build(
+            "./static",
+            "./static/template.html",
+            "./public",
+            cache,
+            args.link_assets,
+            collectors,
+            args.profile_top,
+            args.pstats,
+            args.trace,
+        )
+    elif args.shard:
+        from shard import SHARDS_DIR, build_shard
+        build_shard(
+            "./static",
+            "./static/template.html",
+            "./public",
+            SHARDS_DIR,
+            *args.shard,
+            jobs,
+            cache,
+            args.link_assets,
+        )
+    elif args.merge:
+        from shard import SHARDS_DIR, merge_shards
+        merge_shards("./static", "./static/template.html", "./public", SHARDS_DIR, args.link_assets)
+    elif args.watch:
+        from watch import watch
+        watch(
+            "./static",
+            "./static/template.html",
+            "./public",
+            MANIFEST_PATH,
+            jobs,
+            cache,
+            args.precompress,
+            args.link_assets,
+            collectors,
+        )
+    elif args.incremental:
+        build_incremental(
+            "./static",
+            "./static/template.html",
+            "./public",
+            MANIFEST_PATH,
+            jobs,
+            cache,
+            args.link_assets,
+            INDEX_PATH,
+            collectors,
+        )
+    elif args.pipeline:
+        from pipeline import generate_pages_pipelined
+        index = discover("./static", "./public", "./static/template.html")
+        copy_index(index, "./static", "./public", args.link_assets)
+        generate_pages_pipelined(index.pages, "./static/template.html", jobs, cache)
+    else:
+        # One walk of ./static feeds both copying and rendering
+        index = discover("./static", "./public", "./static/template.html")
+        copy_index(index, "./static", "./public", args.link_assets)
+        for collector in collectors:
+            collector.clear()
+        generate_pages(index.pages, "./static/template.html", jobs, cache, collectors)
+        for collector in collectors:
+            collector.save(index)
 
-def generate_page(from_path, template_path, dest_path):
-    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
-    markdown = ""
-    with open(from_path) as file:
-        markdown = file.read()
-    template = ""
-    with open(template_path) as file:
-        template = file.read()
-
-    html = markdown_to_html_node(markdown).to_html()
-    title = extract_title(markdown)
-
-    result = template.replace("{{ Title }}", title).replace("{{ Content }}", html)
-    file_name = from_path.split("/")[-1][:-3] + ".html"
-    with open(os.path.join(dest_path, file_name), "w") as file:
-        file.write(result)
-
+    if args.precompress and not args.watch:
+        from compress import precompress_r
+        precompress_r("./public", jobs)
+    if cache:
+        cache.prune()
+    if links is not None and links.broken:
+        sys.exit(1)
 
-def copy_r(directory):
-    if not os.path.exists(directory):
-        raise ValueError("directory doesn't exist")
-    
-    if directory == "./static":
-        if not os.path.exists("./public"):
-            os.mkdir("./public")
-        else:
-            shutil.rmtree("./public")
-            os.mkdir("./public")
-    else:
-        temp = directory.replace("static", "public")
-        if not os.path.exists(temp):
-            os.mkdir(temp)
 
-    files = os.listdir(directory)
-    for file in files:
-        path = os.path.join(directory, file)
-        if os.path.isfile(path):
-            shutil.copy(path, path.replace("static", "public"))
-        else:
-            copy_r(path)
+def parse_args(argv=None):
+    from shard import parse_shard
+    parser = argparse.ArgumentParser(description="Static site generator")
+    # Each build mode runs instead of the others, never along with them
+    modes = parser.add_mutually_exclusive_group()
+    modes.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only rebuild outputs whose sources changed since the last build",
+    )
+    modes.add_argument(
+        "--shard",
+        type=parse_shard,
+        metavar="I/N",
+        help="Build only shard I of N of the site into ./shards, see --merge",
+    )
+    modes.add_argument(
+        "--merge",
+        action="store_true",
+        help="Check the shards in ./shards cover the site exactly once and merge them into ./public",
+    )
+    modes.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and rebuild whatever is affected when ./static changes",
+    )
+    modes.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Overlap reading, rendering and writing pages in a pipelined build",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of processes to render pages with, 0 uses every CPU",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Time every build stage and print a report, always a full and serial build",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=10,
+        help="Number of slowest pages to list in the profile report",
+    )
+    parser.add_argument(
+        "--pstats",
+        type=str,
+        default=None,
+        help="Profile the build and write cProfile stats to this file",
+    )
+    parser.add_argument(
+        "--trace",
+        type=str,
+        default=None,
+        help="Profile the build and write Chrome trace events to this JSON file",
+    )
+    parser.add_argument(
+        "--link-assets",
+        action="store_true",
+        help="Hardlink assets into ./public instead of copying them, copies where linking fails",
+    )
+    parser.add_argument(
+        "--search",
+        action="store_true",
+        help="Write a search index sharded by term prefix to ./public/search",
+    )
+    parser.add_argument(
+        "--check-links",
+        action="store_true",
+        help="Report internal links and images that point nowhere, write ./public/backlinks.json",
+    )
+    parser.add_argument(
+        "--metadata",
+        action="store_true",
+        help="Write sitemap.xml, feed.xml and index pages for directories without one",
+    )
+    parser.add_argument(
+        "--base-url",
+        default="http://localhost:8888",
+        help="Absolute URL the site is served from, used by the sitemap and the feed",
+    )
+    parser.add_argument(
+        "--precompress",
+        action="store_true",
+        help="Write a .gz sibling next to every compressible output that changed",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Render every page instead of reusing cached HTML",
+    )
+    parser.add_argument(
+        "--clear-cache",
+        action="store_true",
+        help="Empty the render cache before building",
+    )
+    args = parser.parse_args(argv)
+    if (args.shard or args.merge) and (args.search or args.check_links or args.metadata):
+        parser.error("--search, --check-links and --metadata need a regular build of the whole site")
+    if args.shard and args.precompress:
+        parser.error("--precompress needs ./public, use it with --merge instead of --shard")
+    if (args.profile or args.pstats or args.trace) and (
+        args.incremental or args.shard or args.merge or args.watch or args.pipeline or args.jobs != 1
+    ):
+        parser.error(
+            "--profile, --pstats and --trace time a full serial build, "
+            "not --incremental, --shard, --merge, --watch, --pipeline or --jobs"
+        )
+    if args.pipeline and (args.search or args.check_links or args.metadata):
+        # Pipelined pages go straight from the renderers to disk, nothing
+        # hands them to the collectors
+        parser.error("--search, --check-links and --metadata can't be combined with --pipeline")
+    return args
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+import time
+
+from discover import RACY_SECONDS
+
+
+MANIFEST_VERSION = 1
+
+_hashes = {} # path -> (inode, ctime_ns, mtime_ns, size, digest), reused by long-running builds
+
+
+class Manifest():
+    def __init__(self, template=None, pages=None, assets=None):
+        self.template = template # Hash of the template used for the last build
+        # source -> {"hash", "output", "collectors"}, the names of the
+        # collectors that were handed the page as it is now
+        self.pages = pages if pages is not None else {}
+        self.assets = assets if assets is not None else {} # source -> {"hash", "output"}
+
+    def __eq__(self, other):
+        return (
+            self.template == other.template and
+            self.pages == other.pages and
+            self.assets == other.assets
+        )
+
+    def __repr__(self):
+        return f"Manifest({self.template}, {len(self.pages)} pages, {len(self.assets)} assets)"
+
+    def outputs(self):
+        result = set()
+        for entry in self.pages.values():
+            result.add(entry["output"])
+        for entry in self.assets.values():
+            result.add(entry["output"])
+        return result
+
+    def to_dict(self):
+        return {
+            "version": MANIFEST_VERSION,
+            "template": self.template,
+            "pages": self.pages,
+            "assets": self.assets,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if not isinstance(data, dict):
+            raise TypeError("data is required to be a dictionary")
+        if data.get("version") != MANIFEST_VERSION:
+            raise ValueError("manifest version is not supported")
+        return cls(data.get("template"), data.get("pages"), data.get("assets"))
+
+
+def load_manifest(path):
+    # A missing or unreadable manifest simply means there is nothing to reuse
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as file:
+            return Manifest.from_dict(json.load(file))
+    except (OSError, TypeError, ValueError):
+        return None
+
+
+def save_manifest(manifest, path):
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as file:
+        json.dump(manifest.to_dict(), file, indent=1, sort_keys=True)
+    os.replace(temp_path, path)
+
+
+def hash_file(path):
+    stat = os.stat(path)
+    # mtime can be set back by anyone, ctime can't. A file swapped in by
+    # rename has another inode whatever its times say
+    key = (stat.st_ino, stat.st_ctime_ns, stat.st_mtime_ns, stat.st_size)
+    cached = _hashes.get(path)
+    if cached is not None and cached[:4] == key:
+        return cached[4]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 16), b""):
+            digest.update(chunk)
+    digest = digest.hexdigest()
+    # Like directory listings, a file changed this recently might change
+    # again without its ctime moving
+    if time.time_ns() - stat.st_ctime_ns > RACY_SECONDS * 10 ** 9:
+        _hashes[path] = (*key, digest)
+    return digest
@@ -0,0 +1,41 @@
+import contextlib
+import mmap
+import os
+
+# Sources at least this large are memory-mapped and parsed a line at a time
+# instead of being read into one string
+MMAP_THRESHOLD = 8 * 2 ** 20
+RELEASE_BYTES = 4 * 2 ** 20 # Parsed pages are dropped from the mapping in steps this large
+
+
+def is_large(path):
+    return os.path.getsize(path) >= MMAP_THRESHOLD
+
+
+@contextlib.contextmanager
+def map_file(path):
+    with open(path, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mapped, "madvise"):
+                # Read once front to back, pages behind the parser can go
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            yield mapped
+
+
+def iter_mapped_lines(mapped):
+    # Line boundaries are found in the mapped bytes, only the current line is
+    # copied out and decoded
+    start = 0
+    released = 0
+    size = len(mapped)
+    while start < size:
+        end = mapped.find(b"\n", start)
+        end = size if end == -1 else end + 1
+        yield mapped[start:end].decode()
+        start = end
+        if hasattr(mapped, "madvise") and start - released >= RELEASE_BYTES:
+            # Lines behind the parser don't have to stay resident, they are
+            # faulted in again from the file if anything reads them
+            boundary = start - start % mmap.PAGESIZE
+            mapped.madvise(mmap.MADV_DONTNEED, released, boundary - released)
+            released = boundary
@@ -0,0 +1,199 @@
+import datetime
+import email.utils
+import html
+import json
+import os
+
+from build import page_context
+from publish import page_url, write_json
+from template import load_template
+
+METADATA_VERSION = 1
+BASE_URL = "http://localhost:8888"
+FEED_SIZE = 20
+SITEMAP_FILE = "sitemap.xml"
+FEED_FILE = "feed.xml"
+
+
+def page_date(fields, mtime):
+    # An explicit date in the front matter wins over the file's mtime
+    try:
+        date = datetime.date.fromisoformat(fields.get("date", ""))
+        return datetime.datetime(date.year, date.month, date.day, tzinfo=datetime.timezone.utc).timestamp()
+    except ValueError:
+        return mtime
+
+
+def write_streamed(path, chunks):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "w") as file:
+            for chunk in chunks:
+                file.write(chunk)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+class SiteMetadata():
+    name = "metadata"
+    def __init__(self, public_dir, template_path, base_url=BASE_URL, state_path=None):
+        self.public_dir = public_dir
+        self.template_path = template_path
+        self.base_url = base_url.rstrip("/")
+        self.state_path = state_path
+        self.clear()
+
+    def clear(self):
+        self.pages = {} # source -> {"url", "output", "title", "date", "fields"}
+        self.sections = [] # Index pages written for directories without one
+        self.signature = None # What the aggregates were last written for
+        self.changed = True
+
+    def __repr__(self):
+        return f"SiteMetadata({len(self.pages)} pages)"
+
+    def __contains__(self, source):
+        return source in self.pages
+
+    def add(self, source, output_path, document):
+        entry = {
+            "url": page_url(output_path, self.public_dir),
+            "output": output_path,
+            "title": document["title"],
+            "date": page_date(document["fields"], os.stat(source).st_mtime),
+            "fields": document["fields"],
+        }
+        if self.pages.get(source) != entry:
+            self.pages[source] = entry
+            self.changed = True
+
+    def remove(self, source):
+        if self.pages.pop(source, None) is not None:
+            self.changed = True
+
+    def entries(self):
+        # Newest first, the order feeds are read in
+        return sorted(self.pages.values(), key=lambda entry: (-entry["date"], entry["url"]))
+
+    def save(self, index):
+        # Re-rendering a page with the same metadata leaves the aggregates alone,
+        # the template only matters for the section index pages
+        stat = os.stat(self.template_path)
+        signature = [self.base_url, stat.st_mtime_ns, stat.st_size]
+        if not self.changed and signature == self.signature:
+            return False
+
+        entries = self.entries()
+        write_streamed(os.path.join(self.public_dir, SITEMAP_FILE), self.sitemap(entries))
+        write_streamed(os.path.join(self.public_dir, FEED_FILE), self.feed(entries))
+        self.write_sections(entries)
+
+        self.signature = signature
+        self.changed = False
+        if self.state_path:
+            write_json(self.state_path, self.to_dict())
+        return True
+
+    def outputs(self):
+        # Everything save() wrote, pages link to section index pages like
+        # to any other page
+        return [
+            os.path.join(self.public_dir, SITEMAP_FILE),
+            os.path.join(self.public_dir, FEED_FILE),
+        ] + self.sections
+
+    def sitemap(self, entries):
+        yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+        yield '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+        for entry in sorted(entries, key=lambda entry: entry["url"]):
+            lastmod = datetime.datetime.fromtimestamp(entry["date"], datetime.timezone.utc).date()
+            yield (
+                f"  <url><loc>{html.escape(self.base_url + entry['url'])}</loc>"
+                f"<lastmod>{lastmod.isoformat()}</lastmod></url>\n"
+            )
+        yield "</urlset>\n"
+
+    def feed(self, entries):
+        yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+        yield '<rss version="2.0">\n<channel>\n'
+        home = self.pages_by_url(entries).get("/")
+        title = home["title"] if home else self.base_url
+        yield f"  <title>{html.escape(title)}</title>\n"
+        yield f"  <link>{html.escape(self.base_url)}/</link>\n"
+        yield f"  <description>{html.escape(title)}</description>\n"
+        for entry in entries[:FEED_SIZE]:
+            link = html.escape(self.base_url + entry["url"])
+            yield "  <item>\n"
+            yield f"    <title>{html.escape(entry['title'])}</title>\n"
+            yield f"    <link>{link}</link>\n"
+            yield f"    <guid>{link}</guid>\n"
+            yield f"    <pubDate>{email.utils.formatdate(entry['date'], usegmt=True)}</pubDate>\n"
+            if "description" in entry["fields"]:
+                yield f"    <description>{html.escape(entry['fields']['description'])}</description>\n"
+            yield "  </item>\n"
+        yield "</channel>\n</rss>\n"
+
+    def pages_by_url(self, entries):
+        return {entry["url"]: entry for entry in entries}
+
+    def write_sections(self, entries):
+        # Every directory with pages but without an index page of its own
+        # gets one listing them
+        by_url = self.pages_by_url(entries)
+        sections = {}
+        for entry in entries:
+            directory = entry["url"].rsplit("/", 1)[0] + "/"
+            if directory not in by_url:
+                sections.setdefault(directory, []).append(entry)
+
+        outputs = []
+        template = load_template(self.template_path)
+        for directory, children in sorted(sections.items()):
+            output = os.path.join(self.public_dir, directory.lstrip("/"), "index.html")
+            title = directory.strip("/").rsplit("/", 1)[-1] or "Index"
+            items = "".join(
+                f'<li><a href="{html.escape(child["url"])}">{html.escape(child["title"])}</a></li>'
+                for child in sorted(children, key=lambda child: child["url"])
+            )
+            context = page_context(template, title, f"<ul>{items}</ul>", {})
+            write_streamed(output, [template.render(context)])
+            outputs.append(output)
+
+        # Index pages of sections that now have their own page or no pages
+        # left are not ours to keep
+        for output in set(self.sections) - set(outputs):
+            if os.path.isfile(output) and output not in (entry["output"] for entry in entries):
+                os.remove(output)
+                directory = os.path.dirname(output)
+                if not os.listdir(directory):
+                    os.rmdir(directory)
+        self.sections = outputs
+
+    def to_dict(self):
+        return {
+            "version": METADATA_VERSION,
+            "pages": self.pages,
+            "sections": self.sections,
+            "signature": self.signature,
+        }
+
+
+def load_site_metadata(public_dir, template_path, base_url, state_path):
+    metadata = SiteMetadata(public_dir, template_path, base_url, state_path)
+    # Like the search index, state without its output is from another build
+    if not os.path.exists(os.path.join(public_dir, SITEMAP_FILE)):
+        return metadata
+    try:
+        with open(state_path) as file:
+            data = json.load(file)
+        if data.get("version") != METADATA_VERSION:
+            return metadata
+        metadata.pages = data["pages"]
+        metadata.sections = data["sections"]
+        metadata.signature = data["signature"]
+    except (OSError, TypeError, ValueError, KeyError):
+        return SiteMetadata(public_dir, template_path, base_url, state_path)
+    metadata.changed = False
+    return metadata
@@ -0,0 +1,132 @@
+import asyncio
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from build import block_cache, page_context, page_output_path, render_cached
+from htmlnode import parse_markdown
+from template import load_template
+
+QUEUE_SIZE = 64 # Pages waiting between two stages, bounds memory on huge sites
+READERS = 8
+WRITE_BATCH = 16
+
+DONE = None # Tells a stage worker that nothing else is coming
+
+
+def render_page(markdown, template_path, cache=None):
+    template = load_template(template_path)
+    if cache is None:
+        title, content, fields = parse_markdown(io.StringIO(markdown), block_cache)
+    else:
+        title, content, fields = render_cached(markdown, cache)
+    return template.render(page_context(template, title, content, fields))
+
+
+def read_page(path):
+    with open(path) as file:
+        return file.read()
+
+
+def write_pages(pages):
+    for output_path, html in pages:
+        temp_path = f"{output_path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "w") as file:
+                file.write(html)
+            os.replace(temp_path, output_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+
+async def feed(pages, queue):
+    # The pages come from the one discover() walk the whole build shares
+    for page in pages:
+        await queue.put(page)
+
+
+async def finish_stage(workers, queue, downstream_workers):
+    await asyncio.gather(*workers)
+    for _ in range(downstream_workers):
+        await queue.put(DONE)
+
+
+async def read_pages(pages, markdowns):
+    while True:
+        page = await pages.get()
+        if page is DONE:
+            return
+        markdown = await asyncio.to_thread(read_page, page[0])
+        await markdowns.put((page, markdown))
+
+
+async def render_pages(markdowns, htmls, template_path, executor, cache):
+    loop = asyncio.get_running_loop()
+    while True:
+        item = await markdowns.get()
+        if item is DONE:
+            return
+        (path, dest_path), markdown = item
+        print(f"Generating page from {path} to {dest_path} using {template_path}")
+        html = await loop.run_in_executor(executor, render_page, markdown, template_path, cache)
+        await htmls.put((page_output_path(path, dest_path), html))
+
+
+async def write_batches(htmls):
+    while True:
+        item = await htmls.get()
+        done = item is DONE
+        batch = [] if done else [item]
+        # Take whatever else is already rendered, one thread hop per batch
+        while not done and len(batch) < WRITE_BATCH and not htmls.empty():
+            item = htmls.get_nowait()
+            if item is DONE:
+                done = True
+            else:
+                batch.append(item)
+        if batch:
+            await asyncio.to_thread(write_pages, batch)
+        if done:
+            return
+
+
+async def build_pipelined(
+    pages,
+    template_path,
+    jobs=1,
+    cache=None,
+    queue_size=QUEUE_SIZE,
+):
+    paths = asyncio.Queue(queue_size)
+    markdowns = asyncio.Queue(queue_size)
+    htmls = asyncio.Queue(queue_size)
+
+    # Rendering is CPU bound, more than one renderer needs processes
+    renderers = max(1, jobs)
+    if renderers > 1:
+        executor = ProcessPoolExecutor(max_workers=renderers)
+    else:
+        executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        async with asyncio.TaskGroup() as group:
+            group.create_task(finish_stage([feed(pages, paths)], paths, READERS))
+            readers = [read_pages(paths, markdowns) for _ in range(READERS)]
+            group.create_task(finish_stage(readers, markdowns, renderers))
+            render = [render_pages(markdowns, htmls, template_path, executor, cache) for _ in range(renderers)]
+            group.create_task(finish_stage(render, htmls, 1))
+            group.create_task(write_batches(htmls))
+    except BaseExceptionGroup as group:
+        # Report the failing page like a serial build would, not the group
+        raise group.exceptions[0]
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def generate_pages_pipelined(pages, template_path, jobs=1, cache=None):
+    # Takes (source, dest dir) pairs like generate_pages, the dest dirs have
+    # to exist already
+    if not os.path.exists(template_path):
+        raise ValueError("template_path doesn't exist")
+
+    asyncio.run(build_pipelined(pages, template_path, jobs, cache))
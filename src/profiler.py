@@ -0,0 +1,182 @@
+import contextlib
+import cProfile
+import json
+import os
+import time
+
+from build import copy_index, generate_page, page_output_path
+from discover import discover
+
+# render is what's left of a page outside the stages timed inside it
+STAGES = (
+    "walk",
+    "copy",
+    "read",
+    "markdown_to_blocks",
+    "tokenize",
+    "to_html",
+    "template",
+    "write",
+    "render",
+    "collect",
+    "save",
+)
+
+
+class Profile():
+    def __init__(self, trace=False):
+        self.totals = {} # stage -> seconds, excluding stages nested in it
+        self.calls = {}
+        self.counters = {}
+        self.pages = [] # (seconds, path)
+        self.events = [] if trace else None
+        self.nested = [] # seconds spent in nested stages, per open stage
+        self.origin = time.perf_counter()
+
+    def enter(self):
+        self.nested.append(0.0)
+        return time.perf_counter()
+
+    def exit(self, name, start):
+        elapsed = time.perf_counter() - start
+        nested = self.nested.pop()
+        if self.nested:
+            self.nested[-1] += elapsed
+        self.totals[name] = self.totals.get(name, 0.0) + elapsed - nested
+        self.calls[name] = self.calls.get(name, 0) + 1
+        return elapsed
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = self.enter()
+        try:
+            yield
+        finally:
+            self.add_event(name, start, self.exit(name, start))
+
+    # Stages called per line, block or write are timed like the others, but
+    # are too many and too short to be worth a trace event each
+
+    def timed(self, iterable, name):
+        # Every item pulled from iterable is a call of the stage
+        iterator = iter(iterable)
+        while True:
+            start = self.enter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.exit(name, start)
+            yield item
+
+    def timed_call(self, function, name):
+        def call(*args):
+            start = self.enter()
+            try:
+                return function(*args)
+            finally:
+                self.exit(name, start)
+        return call
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_page(self, path, start, elapsed):
+        self.pages.append((elapsed, path))
+        self.add_event("page", start, elapsed, {"path": path})
+
+    def add_event(self, name, start, elapsed, args=None):
+        if self.events is None:
+            return
+        # Complete events of the Chrome trace format, times in microseconds
+        event = {
+            "name": name,
+            "ph": "X",
+            "ts": (start - self.origin) * 1e6,
+            "dur": elapsed * 1e6,
+            "pid": os.getpid(),
+            "tid": 0,
+        }
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+    def write_trace(self, path):
+        with open(path, "w") as file:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, file)
+
+    def report(self, top=10):
+        total = sum(self.totals.values())
+        lines = [f"{'Stage':<18} {'Total ms':>10} {'Calls':>8} {'Share':>7}"]
+        for name in STAGES:
+            if name not in self.calls:
+                continue
+            seconds = self.totals[name]
+            share = seconds / total * 100 if total else 0.0
+            lines.append(f"{name:<18} {seconds * 1000:10.2f} {self.calls[name]:8d} {share:6.1f}%")
+        lines.append(f"{'total':<18} {total * 1000:10.2f}")
+        lines.append("")
+        lines.append(", ".join(f"{name} {value}" for name, value in sorted(self.counters.items())))
+        if self.pages and top > 0:
+            lines.append("")
+            lines.append(f"Slowest {min(top, len(self.pages))} pages:")
+            for seconds, path in sorted(self.pages, reverse=True)[:top]:
+                lines.append(f"{seconds * 1000:10.2f} ms  {path}")
+        return "\n".join(lines)
+
+
+def profile_build(
+    static_dir,
+    template_path,
+    public_dir,
+    cache=None,
+    link=False,
+    collectors=(),
+    top=10,
+    pstats_path=None,
+    trace_path=None,
+):
+    # The regular serial build. Inside a page, reading, parsing, tokenizing,
+    # serializing and writing interleave in the streaming renderer, each is
+    # timed by the renderer itself and counted without the stages it calls
+    profile = Profile(trace_path is not None)
+    profiler = cProfile.Profile() if pstats_path else None
+    if profiler:
+        profiler.enable()
+    try:
+        with profile.stage("walk"):
+            index = discover(static_dir, public_dir, template_path)
+        with profile.stage("copy"):
+            copy_index(index, static_dir, public_dir, link)
+        for collector in collectors:
+            collector.clear()
+        for path, dest_path in index.pages:
+            start = time.perf_counter()
+            with profile.stage("render"):
+                document = generate_page(path, template_path, dest_path, cache, bool(collectors), profile)
+            output_path = page_output_path(path, dest_path)
+            if collectors:
+                with profile.stage("collect"):
+                    for collector in collectors:
+                        collector.add(path, output_path, document)
+            profile.add_page(path, start, time.perf_counter() - start)
+            profile.count("pages")
+            profile.count("bytes read", os.path.getsize(path))
+            profile.count("bytes written", os.path.getsize(output_path))
+        if collectors:
+            with profile.stage("save"):
+                for collector in collectors:
+                    collector.save(index)
+    finally:
+        if profiler:
+            profiler.disable()
+
+    print(profile.report(top))
+    if profiler:
+        profiler.dump_stats(pstats_path)
+        print(f"Wrote cProfile stats to {pstats_path}")
+    if trace_path:
+        profile.write_trace(trace_path)
+        print(f"Wrote trace events to {trace_path}")
+    return profile
@@ -0,0 +1,99 @@
+import json
+import os
+import shutil
+
+
+def is_asset(path, template_path=None):
+    # Markdown is rendered into .html and the template only read, neither is
+    # served as is
+    if path.endswith(".md"):
+        return False
+    return template_path is None or os.path.normpath(path) != os.path.normpath(template_path)
+
+
+def is_identical(source, output):
+    try:
+        source_stat = os.stat(source)
+        output_stat = os.stat(output)
+    except FileNotFoundError:
+        return False
+    if (source_stat.st_dev, source_stat.st_ino) == (output_stat.st_dev, output_stat.st_ino):
+        return True
+    # Published copies carry the mtime of their source
+    return (
+        source_stat.st_size == output_stat.st_size and
+        source_stat.st_mtime_ns == output_stat.st_mtime_ns
+    )
+
+
+def publish_file(source, output, link=False):
+    if is_identical(source, output):
+        return False
+
+    # Always replace instead of writing in place, output may be a hardlink
+    # to source and truncating it would truncate the source as well
+    temp_path = f"{output}.{os.getpid()}.tmp"
+    try:
+        if not link or not link_file(source, temp_path):
+            copy_file(source, temp_path)
+        os.replace(temp_path, output)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return True
+
+
+def link_file(source, output):
+    try:
+        os.link(source, output)
+    except OSError:
+        # Across filesystems or where links aren't supported
+        return False
+    return True
+
+
+def copy_file(source, output):
+    with open(source, "rb") as source_file, open(output, "wb") as output_file:
+        stat = os.fstat(source_file.fileno())
+        if not copy_file_range(source_file, output_file, stat.st_size):
+            source_file.seek(0)
+            output_file.seek(0)
+            output_file.truncate()
+            # Uses sendfile on Linux, still without a copy through userspace
+            shutil.copyfileobj(source_file, output_file)
+    os.utime(output, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+
+def copy_file_range(source_file, output_file, size):
+    # Lets filesystems that support it share extents instead of copying data
+    if not hasattr(os, "copy_file_range"):
+        return False
+    copied = 0
+    try:
+        while copied < size:
+            count = os.copy_file_range(source_file.fileno(), output_file.fileno(), size - copied)
+            if count == 0:
+                break
+            copied += count
+    except OSError:
+        return False
+    return copied == size
+
+
+def page_url(output_path, public_dir):
+    path = os.path.relpath(output_path, public_dir).replace(os.sep, "/")
+    if path == "index.html":
+        return "/"
+    if path.endswith("/index.html"):
+        return "/" + path[:-len("index.html")]
+    return "/" + path
+
+
+def write_json(path, data):
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as file:
+        json.dump(data, file, separators=(",", ":"), ensure_ascii=False, sort_keys=True)
+    os.replace(temp_path, path)
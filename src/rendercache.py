@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from htmlnode import PARSER_VERSION
+
+DEFAULT_MAX_BYTES = 256 * 2 ** 20
+STALE_TEMP_SECONDS = 3600
+
+
+class RenderCache():
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        if not isinstance(directory, str):
+            raise TypeError("directory is required to be a string")
+        if max_bytes <= 0:
+            raise ValueError("max_bytes is required to be positive")
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def __repr__(self):
+        return f"RenderCache('{self.directory}', {self.max_bytes})"
+
+    def key(self, markdown):
+        # Bumping PARSER_VERSION invalidates everything rendered by older parsers
+        digest = hashlib.sha256(f"{PARSER_VERSION}\0".encode())
+        digest.update(markdown.encode())
+        return digest.hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key):
+        path = self.entry_path(key)
+        try:
+            with open(path) as file:
+                entry = json.load(file)
+            # The modification time doubles as the last access time for eviction
+            os.utime(path)
+            # Pages rendered while nothing collected their text have none
+            return entry["title"], entry["html"], entry["fields"], entry.get("text")
+        except (OSError, ValueError, KeyError, TypeError):
+            # Missing, half-pruned by another builder or corrupted, render again
+            return None
+
+    def put(self, key, title, html, fields=None, text=None):
+        path = self.entry_path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+
+        # Writers never share a temporary file and os.replace is atomic, so
+        # concurrent builders can only ever observe complete entries
+        descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "w") as file:
+                entry = {"title": title, "html": html, "fields": fields or {}}
+                if text is not None:
+                    entry["text"] = text
+                json.dump(entry, file)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    def prune(self):
+        if not os.path.exists(self.directory):
+            return 0
+
+        entries = []
+        total = 0
+        now = time.time()
+        for root, _, files in os.walk(self.directory):
+            for file in files:
+                path = os.path.join(root, file)
+                try:
+                    stat = os.stat(path)
+                    if file.endswith(".tmp"):
+                        # Left behind by a builder that was killed mid-write
+                        if now - stat.st_mtime > STALE_TEMP_SECONDS:
+                            os.remove(path)
+                        continue
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        removed = 0
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        return removed
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,208 @@
+import json
+import os
+import re
+
+from htmlnode import BlockType
+from publish import page_url, write_json
+
+SEARCH_VERSION = 1
+SEARCH_DIR = "search" # Inside the public directory
+PREFIX_LENGTH = 2 # Terms are sharded by their first characters
+TERM_PATTERN = re.compile(r"\w+")
+
+# Written to ./public/search:
+#   pages.json   {"version", "prefix_length", "pages": [[url, title, headings] or null, ...]}
+#                indexed by page id
+#   <prefix>.json  {term: [[page id, first position, delta, delta, ...], ...]}
+#                for every term starting with prefix, positions count words
+#                from the start of the page
+
+
+class PageText():
+    # Handed to parse_markdown, which adds every block as it renders it. Terms
+    # are counted block by block, the page's text is never held whole
+    def __init__(self):
+        self.headings = []
+        self.links = []
+        self.terms = {}
+        self.position = 0
+
+    def __repr__(self):
+        return f"PageText({len(self.terms)} terms, {len(self.links)} links)"
+
+    def add_text(self, text):
+        self.position = add_terms(self.terms, text, self.position)
+
+    def add_block(self, block_type, text, links):
+        if block_type is BlockType.HEADING:
+            self.headings.append(text)
+        self.links.extend(links)
+        self.add_text(text)
+
+    def document(self, title, fields):
+        return {
+            "title": title,
+            "fields": fields,
+            "headings": self.headings,
+            "terms": self.terms,
+            "links": self.links,
+        }
+
+    def to_dict(self):
+        return {
+            "headings": self.headings,
+            "links": self.links,
+            "terms": self.terms,
+            "position": self.position,
+        }
+
+    def load(self, data):
+        self.headings = data["headings"]
+        self.links = [tuple(link) for link in data["links"]]
+        self.terms = data["terms"]
+        self.position = data["position"]
+
+
+def add_terms(terms, text, position):
+    for match in TERM_PATTERN.finditer(text.lower()):
+        terms.setdefault(match.group(), []).append(position)
+        position += 1
+    return position
+
+
+def encode_postings(page_id, positions):
+    posting = [page_id, positions[0]]
+    for previous, position in zip(positions, positions[1:]):
+        posting.append(position - previous)
+    return posting
+
+
+def prefixes(terms):
+    return set(term[:PREFIX_LENGTH] for term in terms)
+
+
+class SearchIndex():
+    name = "search" # Recorded in the manifest for every page it was handed
+    def __init__(self, public_dir, state_path=None):
+        self.public_dir = public_dir
+        self.state_path = state_path
+        self.pages = {} # source -> {"id", "url", "title", "headings", "terms"}
+        self.free_ids = []
+        self.next_id = 0
+        self.added = {} # source -> {term: positions}, not written yet
+        self.stale = set() # Page ids whose written postings have to go
+        self.touched = set() # Shard prefixes to rewrite
+
+    def clear(self):
+        # For builds that start over with an empty public directory
+        self.pages = {}
+        self.free_ids = []
+        self.next_id = 0
+        self.added = {}
+        self.stale = set()
+        self.touched = set()
+
+    def __repr__(self):
+        return f"SearchIndex({len(self.pages)} pages, {len(self.added)} pending)"
+
+    def __contains__(self, source):
+        return source in self.pages
+
+    def directory(self):
+        return os.path.join(self.public_dir, SEARCH_DIR)
+
+    def add(self, source, output_path, document):
+        entry = self.pages.get(source)
+        if entry is None:
+            page_id = self.free_ids.pop() if self.free_ids else self.next_id
+            self.next_id = max(self.next_id, page_id + 1)
+        else:
+            page_id = entry["id"]
+            self.stale.add(page_id)
+            self.touched.update(prefixes(entry["terms"]))
+        self.pages[source] = {
+            "id": page_id,
+            "url": page_url(output_path, self.public_dir),
+            "title": document["title"],
+            "headings": document["headings"],
+            "terms": sorted(document["terms"]),
+        }
+        self.added[source] = document["terms"]
+        self.touched.update(prefixes(document["terms"]))
+
+    def remove(self, source):
+        entry = self.pages.pop(source, None)
+        if entry is None:
+            return
+        self.added.pop(source, None)
+        self.stale.add(entry["id"])
+        self.free_ids.append(entry["id"])
+        self.touched.update(prefixes(entry["terms"]))
+
+    def save(self, index):
+        # Only shards with a term of a changed or removed page are rewritten
+        os.makedirs(self.directory(), exist_ok=True)
+        for prefix in sorted(self.touched):
+            self.write_shard(prefix)
+
+        pages = [None] * self.next_id
+        for entry in self.pages.values():
+            pages[entry["id"]] = [entry["url"], entry["title"], entry["headings"]]
+        write_json(
+            os.path.join(self.directory(), "pages.json"),
+            {"version": SEARCH_VERSION, "prefix_length": PREFIX_LENGTH, "pages": pages},
+        )
+        self.added = {}
+        self.stale = set()
+        self.touched = set()
+        if self.state_path:
+            write_json(self.state_path, self.to_dict())
+
+    def write_shard(self, prefix):
+        path = os.path.join(self.directory(), f"{prefix}.json")
+        shard = {}
+        if os.path.exists(path):
+            with open(path) as file:
+                shard = json.load(file)
+
+        replaced = self.stale | set(self.pages[source]["id"] for source in self.added)
+        for term in list(shard):
+            postings = [posting for posting in shard[term] if posting[0] not in replaced]
+            if postings:
+                shard[term] = postings
+            else:
+                del shard[term]
+        for source, terms in self.added.items():
+            page_id = self.pages[source]["id"]
+            for term, positions in terms.items():
+                if term[:PREFIX_LENGTH] == prefix:
+                    shard.setdefault(term, []).append(encode_postings(page_id, positions))
+
+        if shard:
+            for postings in shard.values():
+                postings.sort()
+            write_json(path, shard)
+        elif os.path.exists(path):
+            os.remove(path)
+
+    def to_dict(self):
+        return {"version": SEARCH_VERSION, "pages": self.pages, "free_ids": self.free_ids}
+
+
+def load_search_index(public_dir, state_path):
+    index = SearchIndex(public_dir, state_path)
+    # State without the written index (public was wiped) is useless
+    if not os.path.exists(os.path.join(index.directory(), "pages.json")):
+        return index
+    try:
+        with open(state_path) as file:
+            data = json.load(file)
+        if data.get("version") != SEARCH_VERSION:
+            return index
+        index.pages = data["pages"]
+        index.free_ids = data["free_ids"]
+    except (OSError, TypeError, ValueError, KeyError):
+        return SearchIndex(public_dir, state_path)
+    index.next_id = max((entry["id"] + 1 for entry in index.pages.values()), default=0)
+    index.next_id = max([index.next_id] + [page_id + 1 for page_id in index.free_ids])
+    return index
@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import shutil
+
+from build import generate_pages, page_output_path, public_path
+from discover import discover
+from manifest import Manifest, hash_file
+from publish import publish_file
+
+SHARD_VERSION = 1
+SHARDS_DIR = "./shards"
+
+# Every shard i of N writes to SHARDS_DIR:
+#   <i>-of-<N>/       the outputs of its pages and assets, laid out like ./public
+#   <i>-of-<N>.json   {"version", "shard", "count", "manifest"}, outputs in the
+#                     manifest are relative to the shard's tree
+
+
+def parse_shard(text):
+    # "i/N" with shards counted from 1
+    index, separator, count = text.partition("/")
+    if not separator:
+        raise ValueError("shard is required to be i/N")
+    index, count = int(index), int(count)
+    if not 1 <= index <= count:
+        raise ValueError("shard is required to be between 1 and the shard count")
+    return index, count
+
+
+def shard_of(path, static_dir, count):
+    # Hashes the path below static_dir, the same on every machine and run,
+    # unlike hash() of a string
+    relative = os.path.relpath(path, static_dir).replace(os.sep, "/")
+    digest = hashlib.sha256(relative.encode()).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+
+def shard_name(index, count):
+    return f"{index}-of-{count}"
+
+
+def build_shard(static_dir, template_path, public_dir, shards_dir, index, count, jobs=1, cache=None, link=False):
+    if not os.path.exists(template_path):
+        raise ValueError("template_path doesn't exist")
+
+    shard_dir = os.path.join(shards_dir, shard_name(index, count))
+    if os.path.exists(shard_dir):
+        shutil.rmtree(shard_dir)
+    os.makedirs(shard_dir)
+    remove_other_counts(shards_dir, count)
+
+    def shard_path(path):
+        # Where an output under public_dir goes in this shard's tree
+        return os.path.normpath(os.path.join(shard_dir, os.path.relpath(path, public_dir)))
+
+    def relative(path):
+        return os.path.relpath(path, shard_dir).replace(os.sep, "/")
+
+    manifest = Manifest(hash_file(template_path))
+    site = discover(static_dir, public_dir, template_path)
+    for path in site.assets:
+        if shard_of(path, static_dir, count) != index:
+            continue
+        output = shard_path(public_path(path, static_dir, public_dir))
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        publish_file(path, output, link)
+        manifest.assets[path] = {"hash": hash_file(path), "output": relative(output)}
+
+    pages = []
+    for path, dest_path in site.pages:
+        if shard_of(path, static_dir, count) != index:
+            continue
+        dest_path = shard_path(dest_path)
+        os.makedirs(dest_path, exist_ok=True)
+        pages.append((path, dest_path))
+        manifest.pages[path] = {"hash": hash_file(path), "output": relative(page_output_path(path, dest_path))}
+    generate_pages(pages, template_path, jobs, cache)
+
+    data = {"version": SHARD_VERSION, "shard": index, "count": count, "manifest": manifest.to_dict()}
+    temp_path = f"{shard_dir}.json.{os.getpid()}.tmp"
+    with open(temp_path, "w") as file:
+        json.dump(data, file, sort_keys=True)
+    os.replace(temp_path, f"{shard_dir}.json")
+    print(f"Built shard {index}/{count}: {len(manifest.pages)} pages, {len(manifest.assets)} assets")
+    return manifest
+
+
+def remove_other_counts(shards_dir, count):
+    # Shards of a run with another shard count can never be merged with this
+    # run's, left behind they would keep --merge from ever succeeding
+    for name in os.listdir(shards_dir):
+        _, separator, other = name.split(".")[0].partition("-of-")
+        if not separator or not other.isdigit() or int(other) == count:
+            continue
+        path = os.path.join(shards_dir, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+
+
+def load_shards(shards_dir):
+    shards = {}
+    for name in sorted(os.listdir(shards_dir)):
+        if not name.endswith(".json"):
+            continue
+        with open(os.path.join(shards_dir, name)) as file:
+            data = json.load(file)
+        if data.get("version") != SHARD_VERSION:
+            raise ValueError(f"shard {name} has an unsupported version")
+        shards[data["shard"], data["count"]] = Manifest.from_dict(data["manifest"])
+    return shards
+
+
+def check_shards(static_dir, template_path, public_dir, shards_dir, shards):
+    # Everything wrong with the shards, an empty list if they can be merged
+    counts = set(count for _, count in shards)
+    if len(counts) != 1:
+        return [f"shards of different shard counts: {sorted(counts)}"]
+    count = counts.pop()
+    problems = []
+    for index in range(1, count + 1):
+        if (index, count) not in shards:
+            problems.append(f"shard {index}/{count} is missing")
+
+    template = hash_file(template_path)
+    site = discover(static_dir, public_dir, template_path)
+    expected = {path: "pages" for path, _ in site.pages}
+    expected.update((path, "assets") for path in site.assets)
+    built = {} # source -> shard that built it
+    outputs = {} # output -> source
+    for (index, _), manifest in sorted(shards.items()):
+        shard_dir = os.path.join(shards_dir, shard_name(index, count))
+        if manifest.template != template:
+            problems.append(f"shard {index}/{count} was built with another template")
+        for kind, entries in (("pages", manifest.pages), ("assets", manifest.assets)):
+            for path, entry in entries.items():
+                if path in built:
+                    problems.append(f"{path} was built by shards {built[path]} and {index}")
+                    continue
+                built[path] = index
+                if expected.get(path) != kind:
+                    problems.append(f"{path} of shard {index}/{count} isn't in {static_dir}")
+                elif hash_file(path) != entry["hash"]:
+                    problems.append(f"{path} changed after shard {index}/{count} was built")
+                if not os.path.isfile(os.path.join(shard_dir, entry["output"])):
+                    problems.append(f"{entry['output']} is missing from shard {index}/{count}")
+                if entry["output"] in outputs:
+                    problems.append(f"{path} and {outputs[entry['output']]} both write {entry['output']}")
+                outputs[entry["output"]] = path
+    for path in sorted(expected.keys() - built.keys()):
+        problems.append(f"{path} wasn't built by any shard")
+    return problems
+
+
+def merge_shards(static_dir, template_path, public_dir, shards_dir, link=False):
+    shards = load_shards(shards_dir)
+    if not shards:
+        raise ValueError("shards_dir has no shards")
+    problems = check_shards(static_dir, template_path, public_dir, shards_dir, shards)
+    if problems:
+        raise ValueError("shards can't be merged:\n" + "\n".join(problems))
+
+    if os.path.exists(public_dir):
+        shutil.rmtree(public_dir)
+    os.mkdir(public_dir)
+    # Directories without outputs exist in a regular build too
+    site = discover(static_dir, public_dir, template_path)
+    for directory in site.directories:
+        os.makedirs(public_path(directory, static_dir, public_dir), exist_ok=True)
+    for (index, count), manifest in sorted(shards.items()):
+        shard_dir = os.path.join(shards_dir, shard_name(index, count))
+        for entry in list(manifest.pages.values()) + list(manifest.assets.values()):
+            output = os.path.join(public_dir, entry["output"])
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+            publish_file(os.path.join(shard_dir, entry["output"]), output, link)
+    print(f"Merged {len(shards)} shards into {public_dir}")
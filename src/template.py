@@ -0,0 +1,75 @@
+import io
+import os
+import re
+
+
+PLACEHOLDER_PATTERN = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+_cache = {} # path -> (mtime_ns, size, Template)
+
+
+class Template():
+    def __init__(self, source):
+        if not isinstance(source, str):
+            raise TypeError("source is required to be a string")
+
+        # Even indexes are literals, odd indexes are placeholder names
+        self.segments = []
+        self.placeholders = {} # name -> original placeholder text
+        position = 0
+        for match in PLACEHOLDER_PATTERN.finditer(source):
+            self.segments.append(source[position:match.start()])
+            self.segments.append(match.group(1))
+            self.placeholders.setdefault(match.group(1), match.group(0))
+            position = match.end()
+        self.segments.append(source[position:])
+
+    def __eq__(self, other):
+        return self.segments == other.segments
+
+    def __repr__(self):
+        return f"Template({len(self.segments) // 2} placeholders)"
+
+    def render(self, context):
+        buffer = io.StringIO()
+        self.render_to(buffer, context)
+        return buffer.getvalue()
+
+    def render_to(self, file, context, profile=None):
+        if not isinstance(context, dict):
+            raise TypeError("context is required to be a dictionary")
+
+        if profile is None:
+            self.write_segments(file, file.write, context)
+            return
+        with profile.stage("template"):
+            self.write_segments(file, profile.timed_call(file.write, "write"), context, profile)
+
+    def write_segments(self, file, write, context, profile=None):
+        for i, segment in enumerate(self.segments):
+            if i % 2 == 0:
+                write(segment)
+            elif segment not in context:
+                # Unknown placeholders are left untouched
+                write(self.placeholders[segment])
+            elif hasattr(context[segment], "write_html"):
+                # HTML nodes are streamed instead of being rendered to a string first
+                context[segment].write_html(file, profile)
+            else:
+                write(str(context[segment]))
+
+
+def load_template(path):
+    stat = os.stat(path)
+    cached = _cache.get(path)
+    if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+
+    with open(path) as file:
+        template = Template(file.read())
+    _cache[path] = (stat.st_mtime_ns, stat.st_size, template)
+    return template
+
+
+def clear_template_cache():
+    _cache.clear()
@@ -0,0 +1,82 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+from compress import compress_file, is_up_to_date, precompress, precompress_r
+from test_main import SiteTestCase, write
+
+
+class TestCompress(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp.name, "index.html")
+        write(self.path, "<p>" + "compressible " * 100 + "</p>")
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def test_round_trip(self):
+        self.assertTrue(compress_file(self.path))
+        with open(self.path, "rb") as file, gzip.open(self.path + ".gz") as gz_file:
+            self.assertEqual(gz_file.read(), file.read())
+        self.assertTrue(is_up_to_date(self.path))
+
+    def test_output_is_deterministic(self):
+        compress_file(self.path)
+        with open(self.path + ".gz", "rb") as file:
+            first = file.read()
+        compress_file(self.path)
+        with open(self.path + ".gz", "rb") as file:
+            self.assertEqual(file.read(), first)
+
+    def test_incompressible_file_has_no_sibling(self):
+        write(self.path, "<p></p>")
+        self.assertFalse(compress_file(self.path))
+        self.assertFalse(os.path.exists(self.path + ".gz"))
+
+    def test_changed_file_is_stale(self):
+        compress_file(self.path)
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        self.assertFalse(is_up_to_date(self.path))
+        self.assertEqual(precompress([self.path]), 1)
+        self.assertEqual(precompress([self.path]), 0)
+
+    def test_skips_other_extensions(self):
+        path = os.path.join(self.temp.name, "image.png")
+        write(path, "x" * 1000)
+        self.assertEqual(precompress([path]), 0)
+        self.assertFalse(os.path.exists(path + ".gz"))
+
+
+class TestPrecompressBuild(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        # Pages have to be long enough for gzip to pay off
+        write("./static/content/index.md", "# Home\n\n" + "Welcome home. " * 50)
+        write("./static/blog/index.md", "# Blog\n\n" + "Read the blog. " * 50)
+
+    def test_orphans_are_removed(self):
+        self.build()
+        precompress_r("./public")
+        self.assertTrue(os.path.exists("./public/index.html.gz"))
+
+        write("./public/archive.tar.gz", "not ours")
+        os.remove("./public/index.html")
+        precompress_r("./public")
+        self.assertFalse(os.path.exists("./public/index.html.gz"))
+        self.assertTrue(os.path.exists("./public/archive.tar.gz"))
+
+    def test_stale_outputs_take_siblings_along(self):
+        self.build()
+        precompress_r("./public")
+        self.assertTrue(os.path.exists("./public/blog/index.html.gz"))
+
+        os.remove("./static/blog/index.md")
+        self.build()
+        self.assertFalse(os.path.exists("./public/blog/index.html.gz"))
+
+
+if __name__ == "__main__":
+    unittest.main()
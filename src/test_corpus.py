@@ -0,0 +1,41 @@
+import os
+import random
+import tempfile
+import unittest
+
+from corpus import generate_markdown, generate_site
+from htmlnode import extract_title, markdown_to_html_node
+from test_main import snapshot
+
+
+class TestCorpus(unittest.TestCase):
+    def test_markdown_is_deterministic(self):
+        first = generate_markdown(random.Random(1))
+        self.assertEqual(generate_markdown(random.Random(1)), first)
+        self.assertNotEqual(generate_markdown(random.Random(2)), first)
+
+    def test_markdown_renders(self):
+        markdown = generate_markdown(random.Random(0), blocks=60, inline_density=0.5, code_every=3)
+        self.assertTrue(extract_title(markdown))
+        html = markdown_to_html_node(markdown).to_html()
+        for tag in ("<pre>", "<ul>", "<ol>", "<blockquote>", "<b>", "<a "):
+            self.assertIn(tag, html)
+
+    def test_code_fences_can_be_disabled(self):
+        markdown = generate_markdown(random.Random(0), code_every=0)
+        self.assertNotIn("```", markdown)
+
+    def test_site_layout(self):
+        with tempfile.TemporaryDirectory() as first, tempfile.TemporaryDirectory() as second:
+            paths = generate_site(os.path.join(first, "static"), pages=30, fan_out=2, depth=2)
+            generate_site(os.path.join(second, "static"), pages=30, fan_out=2, depth=2)
+            self.assertEqual(len(paths), 30)
+            self.assertEqual(snapshot(first), snapshot(second))
+            # 1 + 2 + 4 directories, each with an index page
+            indexes = [path for path in paths if path.endswith("index.md")]
+            self.assertEqual(len(indexes), 7)
+            self.assertTrue(os.path.exists(os.path.join(first, "static", "content", "index.md")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import contextlib
+import io
+import os
+import threading
+import unittest
+
+import client
+from client import request
+from daemon import serve
+from test_main import SiteTestCase, write
+
+
+class TestDaemon(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.socket_path = "./.cache/build.sock"
+
+    def start(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            thread = threading.Thread(target=serve, args=(self.socket_path,))
+            thread.start()
+            while request({"ping": True}, self.socket_path) is None:
+                thread.join(0.01)
+        return thread
+
+    def stop(self, thread):
+        request({"stop": True}, self.socket_path, io.StringIO())
+        thread.join()
+
+    def build(self, argv=("--incremental",)):
+        output = io.StringIO()
+        status = request({"argv": list(argv), "cwd": os.getcwd()}, self.socket_path, output)
+        return status, output.getvalue()
+
+    def test_builds(self):
+        thread = self.start()
+        try:
+            status, output = self.build()
+            self.assertEqual(status, 0)
+            self.assertIn("Generating page from ./static/blog/index.md", output)
+            write("./static/blog/index.md", "# Blog\n\nChanged.")
+            status, output = self.build()
+            self.assertEqual(output.count("Generating page"), 1)
+            with open("./public/blog/index.html") as file:
+                self.assertIn("Changed.", file.read())
+        finally:
+            self.stop(thread)
+        self.assertFalse(os.path.exists(self.socket_path))
+
+    def test_failed_builds(self):
+        thread = self.start()
+        try:
+            status, output = self.build(["--bogus"])
+            self.assertEqual(status, 2)
+            self.assertIn("unrecognized arguments: --bogus", output)
+            os.remove("./static/template.html")
+            status, output = self.build()
+            self.assertEqual(status, 1)
+            self.assertIn("ValueError: template_path doesn't exist", output)
+            status = request({"argv": [], "cwd": "/elsewhere"}, self.socket_path, io.StringIO())
+            self.assertEqual(status, 2)
+        finally:
+            self.stop(thread)
+
+    def test_stale_socket(self):
+        self.stop(self.start())
+        # A daemon that was killed leaves its socket behind
+        write(self.socket_path, "")
+        self.assertIsNone(request({"ping": True}, self.socket_path))
+        self.stop(self.start())
+
+    def test_client_without_daemon(self):
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            client.main(["--incremental"])
+        self.assertIn("Generating page from ./static/blog/index.md", output.getvalue())
+        self.assertTrue(os.path.exists("./public/blog/index.html"))
+
+
+if __name__ == "__main__":
+    unittest.main()
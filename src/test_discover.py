@@ -0,0 +1,71 @@
+import contextlib
+import io
+import os
+import unittest
+
+from build import build_incremental, find_pages_r
+from discover import discover, load_index, save_index
+from test_main import SiteTestCase, write
+
+
+def age(directory, seconds=60):
+    # Listings only persist once their directory is older than RACY_SECONDS
+    for root, _, _ in os.walk(directory):
+        stat = os.stat(root)
+        os.utime(root, ns=(stat.st_atime_ns, stat.st_mtime_ns - seconds * 10 ** 9))
+
+
+class TestDiscover(SiteTestCase):
+    def test_matches_find_pages_r(self):
+        index = discover("./static", "./public", "./static/template.html")
+        self.assertEqual(sorted(index.pages), sorted(find_pages_r("./static", "./public")))
+        self.assertEqual(index.assets, ["./static/index.css"])
+        self.assertEqual(index.templates, ["./static/template.html"])
+        self.assertEqual(sorted(index.directories), ["./static/blog", "./static/content"])
+
+    def test_unchanged_directories_are_not_listed(self):
+        age("./static")
+        first = discover("./static", "./public", "./static/template.html")
+        self.assertEqual(first.scanned, 3)
+        save_index(first, "./.cache/index.json")
+
+        second = discover("./static", "./public", "./static/template.html", load_index("./.cache/index.json"))
+        self.assertEqual(second.scanned, 0)
+        self.assertEqual(second.pages, first.pages)
+        self.assertEqual(second.assets, first.assets)
+
+    def test_changed_directory_is_listed(self):
+        age("./static")
+        first = discover("./static", "./public", "./static/template.html")
+        write("./static/blog/post.md", "# Post\n\nNew.")
+        second = discover("./static", "./public", "./static/template.html", first)
+        self.assertEqual(second.scanned, 1)
+        self.assertIn(("./static/blog/post.md", "./public/blog"), second.pages)
+
+    def test_recent_directories_are_not_persisted(self):
+        index = discover("./static", "./public", "./static/template.html")
+        self.assertEqual(index.listings, {})
+
+    def test_load_corrupt(self):
+        write("./.cache/index.json", "{\"version\": 1, \"directories\": [")
+        self.assertIsNone(load_index("./.cache/index.json"))
+        self.assertIsNone(load_index("./.cache/missing.json"))
+
+    def test_incremental_build_with_index(self):
+        age("./static")
+        self.build()
+        write("./static/blog/post.md", "# Post\n\nNew.")
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(2):
+                build_incremental(
+                    "./static",
+                    "./static/template.html",
+                    "./public",
+                    "./.cache/manifest.json",
+                    index_path="./.cache/index.json",
+                )
+        self.assertTrue(os.path.exists("./public/blog/post.html"))
+
+
+if __name__ == "__main__":
+    unittest.main()
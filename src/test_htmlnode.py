@@ -1,3 +1,4 @@
+import io
 import unittest
 
 from htmlnode import (
@@ -9,8 +10,15 @@ from htmlnode import (
     block_to_block_type,
     markdown_to_blocks,
     text_node_to_html_node,
+    extract_title,
+    iter_blocks,
+    parse_markdown,
+    PARSER_VERSION,
+    split_front_matter,
+    StreamedNode,
 )
 
+from lru import LRUCache
 from textnode import TextType, TextNode
 
 
@@ -112,6 +120,90 @@ class TestHTMLNode(unittest.TestCase):
         ]
         self.assertEqual(markdown_to_blocks(markdown), result)
 
+    def test_iter_blocks_lazy(self):
+        lines = iter(["# Title\n", "\n", "  Paragraph  \n"])
+        blocks = iter_blocks(lines)
+        self.assertEqual(next(blocks), "# Title")
+        self.assertEqual(next(lines), "\n")
+
+    def test_extract_title(self):
+        self.assertEqual(extract_title("\n\n# Hello\n\nWorld"), "Hello")
+        self.assertRaises(Exception, extract_title, "## Hello")
+        self.assertRaises(Exception, extract_title, "")
+
+    def test_parse_markdown_serializes_once(self):
+        title, node, _ = parse_markdown(io.StringIO("# Title\n\nBody"))
+        self.assertIsInstance(node, StreamedNode)
+        self.assertEqual(node.to_html(), "<div><p>Body</p></div>")
+        self.assertRaisesRegex(ValueError, "only be serialized once", node.to_html)
+        self.assertRaises(ValueError, node.write_html, io.StringIO())
+
+    def test_split_front_matter(self):
+        markdown = "---\nDate: 2024-01-02\ndescription: A: b\n---\n# Title\n\nBody"
+        fields, blocks = split_front_matter(iter_blocks(io.StringIO(markdown)))
+        self.assertEqual(fields, {"date": "2024-01-02", "description": "A: b"})
+        self.assertEqual(list(blocks), ["# Title", "Body"])
+        self.assertEqual(extract_title(markdown), "Title")
+        self.assertEqual(markdown_to_html_node(markdown).to_html(), "<div><p>Body</p></div>")
+        title, node, fields = parse_markdown(io.StringIO(markdown))
+        self.assertEqual(fields, {"date": "2024-01-02", "description": "A: b"})
+        self.assertEqual(node.to_html(), "<div><p>Body</p></div>")
+
+    def test_split_front_matter_missing(self):
+        fields, blocks = split_front_matter(iter_blocks(io.StringIO("# Title\n\nBody")))
+        self.assertEqual(fields, {})
+        self.assertEqual(list(blocks), ["# Title", "Body"])
+
+    def test_split_front_matter_invalid(self):
+        self.assertRaises(Exception, extract_title, "---\ndate 2024\n---\n# Title")
+        self.assertRaises(Exception, extract_title, "---\ndate: 2024\n# Title")
+
+    def test_parse_markdown(self):
+        markdown = "# Title\n\n* one\n* two\n\n```\ncode\n```\n1. first\n2. second\n> quote\n\n## End"
+        title, node, fields = parse_markdown(io.StringIO(markdown))
+        self.assertEqual(title, "Title")
+        self.assertEqual(fields, {})
+        self.assertEqual(node.to_html(), markdown_to_html_node(markdown).to_html())
+        self.assertEqual(
+            markdown_to_html_node(markdown).to_html(),
+            "<div><ul><li>one</li><li>two</li></ul><pre><code>code\n</code></pre>"
+            "<ol><li> first</li><li> second</li></ol><blockquote>quote</blockquote><h2>End</h2></div>",
+        )
+
+    def test_parse_markdown_title_only(self):
+        title, node, _ = parse_markdown(["# Title"])
+        self.assertEqual(title, "Title")
+        self.assertRaises(ValueError, node.to_html)
+
+    def test_parser_version_pins_output(self):
+        # Render caches are keyed on PARSER_VERSION. Whoever has to change the
+        # expected HTML here bumps PARSER_VERSION along with it
+        markdown = (
+            "# Title\n\n## Heading with a [link](/x)\n\n```\n# not a heading\n* nor an item\n```\n\n"
+            "* **bold** item\n* `code` item\n\n1. one\n2. two\n\n> quote with ![img](/i.png)\n\nA *paragraph*."
+        )
+        expected = (
+            '<div><h2>Heading with a <a href="/x">link</a></h2>'
+            "<pre><code># not a heading\n* nor an item\n</code></pre>"
+            "<ul><li><b>bold</b> item</li><li><code>code</code> item</li></ul>"
+            "<ol><li> one</li><li> two</li></ol>"
+            '<blockquote>quote with <img src="/i.png" alt="img"></img></blockquote>'
+            "<p>A <i>paragraph</i>.</p></div>"
+        )
+        self.assertEqual((PARSER_VERSION, markdown_to_html_node(markdown).to_html()), (3, expected))
+
+    def test_parse_markdown_block_cache(self):
+        markdown = (
+            "# Title\n\nFooter with a [link](/)\n* item\n* **bold** item\n```\n# not a heading\n* nor an item\n```\n"
+            "1. one\n> quote\n## Heading\nFooter with a [link](/)"
+        )
+        cache = LRUCache(1000)
+        expected = markdown_to_html_node(markdown).to_html()
+        self.assertEqual(parse_markdown(io.StringIO(markdown), cache)[1].to_html(), expected)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(parse_markdown(io.StringIO(markdown), cache)[1].to_html(), expected)
+        self.assertEqual((cache.hits, cache.misses), (8, 6))
+
     def test_to_html_node(self):
         node = TextNode("This is a text node", TextType.BOLD)
         self.assertEqual(str(text_node_to_html_node(node)), "HTMLNode('<b>', 'This is a text node')")
@@ -165,6 +257,28 @@ class TestParentNode(unittest.TestCase):
         ])
         self.assertEqual(node.to_html(), "<p><a href=\"about:blank\">This whole text points to the <i>blank page!</i></a><b>This bold text doesn't point to anything.</b></p>")
 
+    def test_to_html_deeply_nested(self):
+        node = LeafNode(None, "Deep down")
+        for _ in range(10000):
+            node = ParentNode("div", [node])
+        self.assertEqual(node.to_html(), "<div>" * 10000 + "Deep down" + "</div>" * 10000)
+
+    def test_to_html_nested_no_children(self):
+        node = ParentNode("p", [LeafNode("b", "Bold text."), ParentNode("i", [])])
+        self.assertRaises(ValueError, node.to_html)
+
+    def test_write_html(self):
+        node = ParentNode("p", [
+            ParentNode("a", [
+                LeafNode(None, "Link to the "),
+                LeafNode("i", "blank page!"),
+            ], {"href": "about:blank", "target": "_blank"}),
+            LeafNode("img", "", {"src": "/background.png", "alt": "Background"}),
+        ])
+        file = io.StringIO()
+        node.write_html(file)
+        self.assertEqual(file.getvalue(), node.to_html())
+
 class TestLeafNode(unittest.TestCase):
     def test_to_html_value_error(self):
         node = LeafNode()
@@ -0,0 +1,113 @@
+import contextlib
+import io
+import json
+import os
+import unittest
+from unittest import mock
+
+from build import build_incremental
+from links import load_link_graph, resolve
+from metadata import load_site_metadata
+from test_main import SiteTestCase, write
+from watch import Rebuilder
+
+
+class TestResolve(unittest.TestCase):
+    def test_resolve(self):
+        self.assertEqual(resolve("/blog/", "/"), "/blog/")
+        self.assertEqual(resolve("../index.css", "/blog/post.html"), "/index.css")
+        self.assertEqual(resolve("post.html#top", "/blog/"), "/blog/post.html")
+        self.assertEqual(resolve("/a%20b.png", "/"), "/a b.png")
+        self.assertIsNone(resolve("https://example.com/", "/"))
+        self.assertIsNone(resolve("//example.com/x", "/"))
+        self.assertIsNone(resolve("#section", "/blog/"))
+        self.assertIsNone(resolve("mailto:someone@example.com", "/"))
+
+
+class TestLinkGraph(SiteTestCase):
+    def check(self):
+        graph = load_link_graph("./static", "./public", "./.cache/links.json")
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            build_incremental(
+                "./static",
+                "./static/template.html",
+                "./public",
+                "./.cache/manifest.json",
+                collectors=[graph],
+            )
+        return graph, output.getvalue()
+
+    def test_valid_links(self):
+        write("./static/content/index.md", "# Home\n\n[Blog](/blog) and ![bg](/index.css) and [out](https://x.org)")
+        graph, output = self.check()
+        self.assertEqual(graph.broken, {})
+        self.assertIn("Checked links of 2 pages, 0 broken", output)
+        with open("./public/backlinks.json") as file:
+            self.assertEqual(json.load(file), {"/": ["/blog/"], "/blog/": ["/"], "/index.css": ["/"]})
+
+    def test_broken_links(self):
+        write("./static/content/index.md", "# Home\n\n[Gone](/gone/) and ![Missing](missing.png)")
+        graph, output = self.check()
+        self.assertIn("Broken link in ./static/content/index.md: /gone/", output)
+        self.assertIn("Broken image in ./static/content/index.md: /missing.png", output)
+
+    def test_only_changed_pages_are_checked(self):
+        self.check()
+        write("./static/blog/index.md", "# Blog\n\nSee [nothing](/nothing).")
+        graph, output = self.check()
+        self.assertIn("Checked links of 1 pages, 1 broken", output)
+
+    def test_removed_target_rechecks_linking_pages(self):
+        self.check()
+        os.remove("./static/content/index.md")
+        graph, output = self.check()
+        # The blog links to the home page that just went away
+        self.assertIn("Broken link in ./static/blog/index.md: /", output)
+        write("./static/content/index.md", "# Home\n\nBack.")
+        graph, output = self.check()
+        self.assertEqual(graph.broken, {})
+
+    def test_rebuild_checks_against_the_current_site(self):
+        graph, _ = self.check()
+        rebuilder = Rebuilder(
+            "./static",
+            "./static/template.html",
+            "./public",
+            "./.cache/manifest.json",
+            collectors=[graph],
+        )
+        with contextlib.redirect_stdout(io.StringIO()) as output, mock.patch("watch.discover") as discover:
+            os.remove("./static/index.css")
+            write("./static/content/index.md", "# Home\n\n![bg](/index.css)")
+            rebuilder.rebuild({"./static/index.css", "./static/content/index.md"})
+        discover.assert_not_called()
+        self.assertIn("Broken image in ./static/content/index.md: /index.css", output.getvalue())
+
+    def test_links_into_metadata_outputs(self):
+        write("./static/notes/first.md", "# First\n\n[All notes](/notes/) and [sitemap](/sitemap.xml)")
+        metadata = load_site_metadata("./public", "./static/template.html", "https://example.com", "./.cache/metadata.json")
+        graph = load_link_graph("./static", "./public", "./.cache/links.json")
+        graph.generators.append(metadata)
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            build_incremental(
+                "./static",
+                "./static/template.html",
+                "./public",
+                "./.cache/manifest.json",
+                collectors=[metadata, graph],
+            )
+        self.assertEqual(graph.broken, {})
+        self.assertIn("Checked links of 3 pages, 0 broken", output.getvalue())
+        # Without the metadata, neither is a page of the site
+        graph, output = self.check()
+        self.assertIn("Broken link in ./static/notes/first.md: /notes/", output)
+        self.assertIn("Broken link in ./static/notes/first.md: /sitemap.xml", output)
+
+    def test_urls_are_interned(self):
+        write("./static/content/index.md", "# Home\n\n[a](/blog/) [b](/blog/) [c](/blog/)")
+        graph, _ = self.check()
+        self.assertEqual(graph.urls.count("/blog/"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
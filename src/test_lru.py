@@ -0,0 +1,46 @@
+import unittest
+
+from lru import LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_get_put(self):
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertIn("c", cache)
+
+    def test_sizeof(self):
+        cache = LRUCache(10, len)
+        cache.put("a", "x" * 6)
+        cache.put("b", "x" * 6)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.size, 6)
+        cache.put("c", "x" * 11)
+        self.assertNotIn("c", cache)
+
+    def test_replace(self):
+        cache = LRUCache(10, len)
+        cache.put("a", "xxx")
+        cache.put("a", "xxxxx")
+        self.assertEqual(cache.size, 5)
+        self.assertEqual(cache.pop("a"), "xxxxx")
+        self.assertEqual(cache.size, 0)
+
+    def test_max_size_value_error(self):
+        self.assertRaises(ValueError, LRUCache, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,214 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import mapped
+from build import (
+    build_incremental,
+    copy_index,
+    copy_r,
+    generate_pages,
+    generate_pages_r,
+    find_pages_r,
+    public_path,
+)
+from discover import discover
+from manifest import Manifest, hash_file, load_manifest, save_manifest
+from rendercache import RenderCache
+
+
+TEMPLATE = "<title>{{ Title }}</title><article>{{ Content }}</article>"
+
+
+def write(path, text):
+    directory = os.path.dirname(path)
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    with open(path, "w") as file:
+        file.write(text)
+
+
+def snapshot(directory):
+    result = {}
+    for root, dirs, files in os.walk(directory):
+        for name in dirs:
+            result[os.path.relpath(os.path.join(root, name), directory)] = None
+        for name in files:
+            path = os.path.join(root, name)
+            with open(path, "rb") as file:
+                result[os.path.relpath(path, directory)] = file.read()
+    return result
+
+
+class SiteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.temp = tempfile.TemporaryDirectory()
+        os.chdir(self.temp.name)
+        write("./static/template.html", TEMPLATE)
+        write("./static/index.css", "body {}")
+        write("./static/content/index.md", "# Home\n\nWelcome *home*.")
+        write("./static/blog/index.md", "# Blog\n\nSee the [home](/) page.")
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.temp.cleanup()
+
+    def build(self):
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            build_incremental("./static", "./static/template.html", "./public", "./.cache/manifest.json")
+        return output.getvalue()
+
+    def clean_build(self):
+        # What a default build of main() does
+        with contextlib.redirect_stdout(io.StringIO()):
+            index = discover("./static", "./public", "./static/template.html")
+            copy_index(index, "./static", "./public")
+            generate_pages(index.pages, "./static/template.html")
+        return snapshot("./public")
+
+
+class TestIncrementalBuild(SiteTestCase):
+    def test_first_build_matches_clean(self):
+        self.build()
+        self.assertEqual(snapshot("./public"), self.clean_build())
+
+    def test_no_changes_renders_nothing(self):
+        self.build()
+        self.assertEqual(self.build(), "")
+
+    def test_only_changed_page_is_rendered(self):
+        self.build()
+        write("./static/blog/index.md", "# Blog\n\nUpdated.")
+        output = self.build()
+        self.assertIn("./static/blog/index.md", output)
+        self.assertNotIn("./static/content/index.md", output)
+        self.assertEqual(snapshot("./public"), self.clean_build())
+
+    def test_template_change_renders_everything(self):
+        self.build()
+        write("./static/template.html", "<h1>{{ Title }}</h1>{{ Content }}")
+        output = self.build()
+        self.assertIn("./static/blog/index.md", output)
+        self.assertIn("./static/content/index.md", output)
+        self.assertEqual(snapshot("./public"), self.clean_build())
+
+    def test_removed_sources_are_deleted(self):
+        self.build()
+        os.remove("./static/blog/index.md")
+        os.rmdir("./static/blog")
+        self.build()
+        self.assertFalse(os.path.exists("./public/blog"))
+        self.assertEqual(snapshot("./public"), self.clean_build())
+
+    def test_static_in_names(self):
+        # Only the leading ./static is mapped to ./public
+        write("./static/docs/static-notes/a.css", "a {}")
+        write("./static/docs/static-notes/index.md", "# Notes\n\nText.")
+        self.build()
+        self.assertTrue(os.path.exists("./public/docs/static-notes/a.css"))
+        self.assertTrue(os.path.exists("./public/docs/static-notes/index.html"))
+        self.assertEqual(snapshot("./public"), self.clean_build())
+
+    def test_missing_output_is_restored(self):
+        self.build()
+        os.remove("./public/index.css")
+        os.remove("./public/index.html")
+        self.build()
+        self.assertEqual(snapshot("./public"), self.clean_build())
+
+
+class TestFrontMatter(SiteTestCase):
+    def test_fields_fill_placeholders(self):
+        write("./static/template.html", '<meta content="{{ description }}"><title>{{ Title }}</title>{{ Content }}')
+        write("./static/blog/index.md", "---\ndescription: News & more\n---\n# Blog\n\nPosts.")
+        cache = RenderCache("./.cache/render")
+        os.makedirs("./public/blog")
+        # Streamed, rendered into the cache, from the cache and memory-mapped
+        default = mapped.MMAP_THRESHOLD
+        for cached, threshold in ((None, default), (cache, default), (cache, default), (None, 0)):
+            with contextlib.redirect_stdout(io.StringIO()), mock.patch.object(mapped, "MMAP_THRESHOLD", threshold):
+                generate_pages([("./static/blog/index.md", "./public/blog")], "./static/template.html", cache=cached)
+                generate_pages([("./static/content/index.md", "./public")], "./static/template.html", cache=cached)
+            with open("./public/blog/index.html") as file:
+                self.assertEqual(
+                    file.read(),
+                    '<meta content="News &amp; more"><title>Blog</title><div><p>Posts.</p></div>',
+                )
+            # Pages without the field leave it empty
+            with open("./public/index.html") as file:
+                self.assertTrue(file.read().startswith('<meta content=""><title>Home</title>'))
+
+
+class TestParallelBuild(SiteTestCase):
+    def test_matches_serial_build(self):
+        for i in range(8):
+            write(f"./static/post{i}/index.md", f"# Post {i}\n\nBody **{i}**.")
+        expected = self.clean_build()
+        with contextlib.redirect_stdout(io.StringIO()) as serial:
+            generate_pages_r("./static", "./static/template.html", "./public")
+        with contextlib.redirect_stdout(io.StringIO()) as parallel:
+            generate_pages_r("./static", "./static/template.html", "./public", jobs=3)
+        self.assertEqual(snapshot("./public"), expected)
+        self.assertEqual(parallel.getvalue(), serial.getvalue())
+
+    def test_bad_page_is_reported(self):
+        write("./static/bad/index.md", "No title here\n\nJust a body.")
+        pages = find_pages_r("./static", "./public")
+        with contextlib.redirect_stdout(io.StringIO()):
+            copy_r("./static", "./static/template.html")
+            with self.assertRaisesRegex(Exception, "h1 header is required"):
+                generate_pages(pages, "./static/template.html", jobs=2)
+
+
+class TestPublicPath(unittest.TestCase):
+    def test_public_path(self):
+        self.assertEqual(public_path("./static/static/a.css"), "./public/static/a.css")
+        self.assertEqual(public_path("./static"), "./public")
+        self.assertEqual(public_path("/srv/static/a", "/srv/static", "/srv/out"), "/srv/out/a")
+        self.assertRaises(ValueError, public_path, "./staticky/a.css")
+
+
+class TestManifest(unittest.TestCase):
+    def test_round_trip(self):
+        manifest = Manifest("abc", {"a.md": {"hash": "1", "output": "a.html"}})
+        with tempfile.TemporaryDirectory() as temp:
+            path = os.path.join(temp, "cache", "manifest.json")
+            save_manifest(manifest, path)
+            self.assertEqual(load_manifest(path), manifest)
+
+    def test_load_corrupt(self):
+        with tempfile.TemporaryDirectory() as temp:
+            path = os.path.join(temp, "manifest.json")
+            write(path, "{not json")
+            self.assertIsNone(load_manifest(path))
+
+    def test_outputs(self):
+        manifest = Manifest(
+            "abc",
+            {"a.md": {"hash": "1", "output": "a.html"}},
+            {"a.css": {"hash": "2", "output": "b.css"}},
+        )
+        self.assertEqual(manifest.outputs(), {"a.html", "b.css"})
+
+    def test_hash_sees_files_with_old_mtimes(self):
+        with tempfile.TemporaryDirectory() as temp:
+            path = os.path.join(temp, "a.css")
+            write(path, "body { color: red; }")
+            os.utime(path, ns=(10 ** 18, 10 ** 18))
+            # Far enough ahead that nothing is racy, only the key can miss
+            with mock.patch("time.time_ns", return_value=os.stat(path).st_ctime_ns + 10 ** 12):
+                first = hash_file(path)
+                # Restored from a backup or switched to by a checkout, with the
+                # size and mtime of the old file
+                write(path + ".new", "body { color: tan; }")
+                os.utime(path + ".new", ns=(10 ** 18, 10 ** 18))
+                os.replace(path + ".new", path)
+                self.assertNotEqual(hash_file(path), first)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import contextlib
+import io
+import os
+import random
+import unittest
+from unittest import mock
+
+import mapped
+from build import build_incremental
+from corpus import generate_markdown
+from mapped import iter_mapped_lines, map_file
+from test_main import SiteTestCase, snapshot, write
+from test_search import page_document
+
+
+class TestMappedLines(SiteTestCase):
+    def test_lines_match_text_file(self):
+        write("./static/page.md", "# Title\r\n\r\nfirst\n\nlast without newline ü")
+        with map_file("./static/page.md") as file:
+            lines = list(iter_mapped_lines(file))
+        self.assertEqual(lines, ["# Title\r\n", "\r\n", "first\n", "\n", "last without newline ü"])
+
+    def test_released_lines(self):
+        markdown = "\n\n".join(f"line {i}" for i in range(2000))
+        write("./static/page.md", markdown)
+        with mock.patch.object(mapped, "RELEASE_BYTES", 1):
+            with map_file("./static/page.md") as file:
+                self.assertEqual("".join(iter_mapped_lines(file)), markdown)
+
+    def test_large_pages_match(self):
+        markdown = generate_markdown(random.Random(0), blocks=200)
+        write("./static/content/index.md", markdown)
+        documents = DocumentCollector()
+        build = lambda: build_incremental(
+            "./static",
+            "./static/template.html",
+            "./public",
+            "./.cache/manifest.json",
+            collectors=[documents],
+        )
+        with contextlib.redirect_stdout(io.StringIO()):
+            build()
+            expected = snapshot("./public")
+            os.remove("./.cache/manifest.json")
+            with mock.patch.object(mapped, "MMAP_THRESHOLD", 0):
+                build()
+        self.assertEqual(snapshot("./public"), expected)
+        self.assertEqual(documents.documents["./static/content/index.md"], page_document(markdown))
+
+
+class DocumentCollector():
+    name = "documents"
+
+    def __init__(self):
+        self.documents = {}
+
+    def __contains__(self, source):
+        return source in self.documents
+
+    def clear(self):
+        self.documents = {}
+
+    def add(self, source, output_path, document):
+        self.documents[source] = document
+
+    def remove(self, source):
+        self.documents.pop(source, None)
+
+    def save(self, index):
+        pass
+
+
+if __name__ == "__main__":
+    unittest.main()
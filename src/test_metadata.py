@@ -0,0 +1,97 @@
+import contextlib
+import io
+import os
+import unittest
+
+from build import build_incremental
+from metadata import load_site_metadata, page_date
+from test_main import SiteTestCase, write
+
+
+class TestPageDate(unittest.TestCase):
+    def test_page_date(self):
+        self.assertEqual(page_date({"date": "2024-01-02"}, 5.0), 1704153600.0)
+        self.assertEqual(page_date({"date": "soon"}, 5.0), 5.0)
+        self.assertEqual(page_date({}, 5.0), 5.0)
+
+
+class TestSiteMetadata(SiteTestCase):
+    def build_metadata(self):
+        metadata = load_site_metadata(
+            "./public",
+            "./static/template.html",
+            "https://example.com/",
+            "./.cache/metadata.json",
+        )
+        with contextlib.redirect_stdout(io.StringIO()):
+            build_incremental(
+                "./static",
+                "./static/template.html",
+                "./public",
+                "./.cache/manifest.json",
+                collectors=[metadata],
+            )
+        return metadata
+
+    def read(self, path):
+        with open(path) as file:
+            return file.read()
+
+    def test_sitemap_and_feed(self):
+        write("./static/blog/index.md", "---\ndate: 2024-01-02\ndescription: News & more\n---\n# Blog\n\nPosts.")
+        self.build_metadata()
+        sitemap = self.read("./public/sitemap.xml")
+        self.assertIn("<loc>https://example.com/</loc>", sitemap)
+        self.assertIn("<loc>https://example.com/blog/</loc><lastmod>2024-01-02</lastmod>", sitemap)
+        feed = self.read("./public/feed.xml")
+        self.assertIn("<title>Home</title>", feed)
+        self.assertIn("<pubDate>Tue, 02 Jan 2024 00:00:00 GMT</pubDate>", feed)
+        self.assertIn("<description>News &amp; more</description>", feed)
+        # Newest first
+        self.assertLess(feed.index("https://example.com/</link>\n    <guid>"), feed.index("/blog/</link>"))
+
+    def test_section_index(self):
+        write("./static/notes/first.md", "# First\n\nOne.")
+        write("./static/notes/second.md", "# Second\n\nTwo.")
+        self.build_metadata()
+        section = self.read("./public/notes/index.html")
+        self.assertIn("<title>notes</title>", section)
+        self.assertIn('<li><a href="/notes/first.html">First</a></li>', section)
+        # A page of its own replaces the generated one
+        write("./static/notes/index.md", "# Notes\n\nAll of them.")
+        self.build_metadata()
+        self.assertIn("All of them.", self.read("./public/notes/index.html"))
+        os.remove("./static/notes/index.md")
+        self.build_metadata()
+        self.assertIn("Second</a>", self.read("./public/notes/index.html"))
+        os.remove("./static/notes/first.md")
+        os.remove("./static/notes/second.md")
+        os.rmdir("./static/notes")
+        self.build_metadata()
+        self.assertFalse(os.path.exists("./public/notes"))
+
+    def test_section_index_fills_page_fields(self):
+        write("./static/template.html", '<meta content="{{ description }}"><title>{{ Title }}</title>{{ Content }}')
+        write("./static/notes/first.md", "---\ndescription: Notes\n---\n# First\n\nOne.")
+        self.build_metadata()
+        self.assertIn('<meta content="Notes">', self.read("./public/notes/first.html"))
+        # A section has no fields of its own
+        self.assertTrue(self.read("./public/notes/index.html").startswith('<meta content=""><title>notes</title>'))
+
+    def test_unchanged_metadata_is_not_rewritten(self):
+        self.build_metadata()
+        mtime = os.stat("./public/sitemap.xml").st_mtime_ns
+        # Rendered again, but with the same title and date
+        stat = os.stat("./static/blog/index.md")
+        write("./static/blog/index.md", "# Blog\n\nSomething else.")
+        os.utime("./static/blog/index.md", ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        metadata = self.build_metadata()
+        self.assertFalse(metadata.changed)
+        self.assertEqual(os.stat("./public/sitemap.xml").st_mtime_ns, mtime)
+        write("./static/blog/index.md", "# Renamed\n\nPosts.")
+        self.build_metadata()
+        self.assertIn("Renamed", self.read("./public/feed.xml"))
+
+
+if __name__ == "__main__":
+    unittest.main()
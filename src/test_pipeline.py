@@ -0,0 +1,64 @@
+import asyncio
+import contextlib
+import io
+import unittest
+
+from build import copy_index
+from corpus import generate_site
+from discover import discover
+from main import parse_args
+from pipeline import build_pipelined, generate_pages_pipelined
+from test_main import SiteTestCase, snapshot, write
+
+
+class TestPipelinedBuild(SiteTestCase):
+    def pipelined_build(self, jobs=1, queue_size=None):
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            index = discover("./static", "./public", "./static/template.html")
+            copy_index(index, "./static", "./public")
+            if queue_size is None:
+                generate_pages_pipelined(index.pages, "./static/template.html", jobs)
+            else:
+                asyncio.run(build_pipelined(index.pages, "./static/template.html", jobs, queue_size=queue_size))
+        return output.getvalue()
+
+    def test_matches_serial_build(self):
+        expected = self.clean_build()
+        output = self.pipelined_build()
+        self.assertEqual(snapshot("./public"), expected)
+        self.assertEqual(output.count("Generating page"), 2)
+
+    def test_matches_parallel_build(self):
+        expected = self.clean_build()
+        self.pipelined_build(jobs=2)
+        self.assertEqual(snapshot("./public"), expected)
+
+    def test_small_queues(self):
+        # Far more pages than queue slots, every stage has to wait on the next
+        generate_site("./static", pages=60, fan_out=3, depth=1, blocks=5)
+        expected = self.clean_build()
+        self.pipelined_build(queue_size=1)
+        self.assertEqual(snapshot("./public"), expected)
+
+    def test_bad_page_is_reported(self):
+        write("./static/broken/index.md", "# Broken\n\nUnclosed **bold")
+        with self.assertRaisesRegex(Exception, "missing closing delimiter"):
+            self.pipelined_build()
+
+    def test_missing_template(self):
+        with self.assertRaises(ValueError):
+            generate_pages_pipelined([], "./static/missing.html")
+
+    def test_collectors_are_rejected(self):
+        for flag in ("--search", "--check-links", "--metadata"):
+            with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+                parse_args(["--pipeline", flag])
+
+    def test_other_modes_are_rejected(self):
+        for flag in ("--incremental", "--watch", "--merge"):
+            with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+                parse_args(["--pipeline", flag])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import contextlib
+import io
+import json
+import os
+import pstats
+import time
+import unittest
+
+import build
+from main import parse_args
+from profiler import Profile, profile_build
+from search import SearchIndex
+from test_main import SiteTestCase, snapshot
+
+
+class TestProfile(SiteTestCase):
+    def profile_build(self, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            profile = profile_build("./static", "./static/template.html", "./public", **kwargs)
+        return profile, output.getvalue()
+
+    def test_matches_clean_build(self):
+        self.profile_build()
+        profiled = snapshot("./public")
+        self.assertEqual(self.clean_build(), profiled)
+
+    def test_report(self):
+        profile, output = self.profile_build(top=1)
+        self.assertEqual(profile.counters["pages"], 2)
+        self.assertEqual(profile.calls["render"], 2)
+        self.assertNotIn("collect", profile.calls)
+        self.assertIn("Slowest 1 pages:", output)
+
+    def test_stages_inside_pages(self):
+        build.block_cache.clear()
+        profile, output = self.profile_build()
+        for name in ("walk", "copy", "read", "markdown_to_blocks", "tokenize", "to_html", "template", "write"):
+            self.assertIn(name, profile.calls)
+            self.assertRegex(output, rf"\n{name} +\d")
+        self.assertEqual(profile.calls["to_html"], 2)
+        # A paragraph per page below its <div>, rendered once into the block
+        # cache and written as a single node
+        self.assertEqual(profile.counters["blocks"], 2)
+        self.assertEqual(profile.counters["nodes"], 4)
+        self.assertEqual(profile.calls["tokenize"], 2)
+
+    def test_collectors(self):
+        search = SearchIndex("./public")
+        profile, _ = self.profile_build(collectors=[search])
+        self.assertEqual(profile.calls["collect"], 2)
+        self.assertIn("./static/content/index.md", search)
+        self.assertTrue(os.path.exists("./public/search/pages.json"))
+
+    def test_unsupported_flags_are_rejected(self):
+        for flags in (["--incremental"], ["--shard", "1/2"], ["--watch"], ["--pipeline"], ["--jobs", "2"]):
+            with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+                parse_args(["--profile"] + flags)
+
+    def test_nested_stages_are_exclusive(self):
+        profile = Profile()
+        write = profile.timed_call(time.sleep, "write")
+        with profile.stage("template"):
+            for _ in profile.timed(range(2), "read"):
+                write(0.01)
+        self.assertEqual(profile.calls, {"template": 1, "read": 3, "write": 2})
+        self.assertGreaterEqual(profile.totals["write"], 0.02)
+        self.assertLess(profile.totals["template"], 0.01)
+        self.assertIsNone(profile.events)
+        report = profile.report()
+        for name in ("template", "read", "write"):
+            self.assertRegex(report, rf"\n{name} +\d")
+
+    def test_trace_and_pstats(self):
+        self.profile_build(pstats_path="./build.prof", trace_path="./trace.json")
+        with open("./trace.json") as file:
+            events = json.load(file)["traceEvents"]
+        pages = [event for event in events if event["name"] == "page"]
+        self.assertEqual(len(pages), 2)
+        self.assertTrue(all(event["ph"] == "X" for event in events))
+        self.assertGreater(pstats.Stats("./build.prof").total_calls, 0)
+        self.assertTrue(os.path.exists("./public/index.html"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from build import build_incremental
+from publish import is_asset, is_identical, page_url, publish_file
+from test_main import SiteTestCase, snapshot, write
+
+
+class TestPublish(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.temp.name, "static", "background.png")
+        self.output = os.path.join(self.temp.name, "public", "background.png")
+        write(self.source, "pixels")
+        os.makedirs(os.path.dirname(self.output))
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def read(self, path):
+        with open(path) as file:
+            return file.read()
+
+    def test_is_asset(self):
+        self.assertTrue(is_asset("./static/index.css", "./static/template.html"))
+        self.assertFalse(is_asset("./static/content/index.md", "./static/template.html"))
+        self.assertFalse(is_asset("./static/template.html", "static/template.html"))
+
+    def test_copy(self):
+        self.assertTrue(publish_file(self.source, self.output))
+        self.assertEqual(self.read(self.output), "pixels")
+        self.assertNotEqual(os.stat(self.source).st_ino, os.stat(self.output).st_ino)
+        self.assertEqual(os.stat(self.source).st_mtime_ns, os.stat(self.output).st_mtime_ns)
+
+    def test_identical_file_is_skipped(self):
+        publish_file(self.source, self.output)
+        self.assertTrue(is_identical(self.source, self.output))
+        self.assertFalse(publish_file(self.source, self.output))
+
+    def test_changed_file_is_published(self):
+        publish_file(self.source, self.output)
+        write(self.source, "more pixels")
+        self.assertTrue(publish_file(self.source, self.output))
+        self.assertEqual(self.read(self.output), "more pixels")
+
+    def test_link(self):
+        self.assertTrue(publish_file(self.source, self.output, link=True))
+        self.assertEqual(os.stat(self.source).st_ino, os.stat(self.output).st_ino)
+        self.assertFalse(publish_file(self.source, self.output, link=True))
+
+    def test_link_falls_back_to_copy(self):
+        with mock.patch("os.link", side_effect=OSError("cross-device link")):
+            self.assertTrue(publish_file(self.source, self.output, link=True))
+        self.assertEqual(self.read(self.output), "pixels")
+
+    def test_copy_falls_back_without_copy_file_range(self):
+        with mock.patch("os.copy_file_range", side_effect=OSError("not supported"), create=True):
+            self.assertTrue(publish_file(self.source, self.output))
+        self.assertEqual(self.read(self.output), "pixels")
+
+    def test_copy_over_link_keeps_source(self):
+        publish_file(self.source, self.output, link=True)
+        other = os.path.join(self.temp.name, "other.png")
+        write(other, "different")
+        publish_file(other, self.output)
+        self.assertEqual(self.read(self.source), "pixels")
+        self.assertEqual(self.read(self.output), "different")
+
+    def test_page_url(self):
+        self.assertEqual(page_url("./public/index.html", "./public"), "/")
+        self.assertEqual(page_url("./public/blog/index.html", "./public"), "/blog/")
+        self.assertEqual(page_url("./public/blog/post.html", "./public"), "/blog/post.html")
+
+
+class TestPublishBuild(SiteTestCase):
+    def test_sources_are_not_published(self):
+        self.build()
+        self.assertTrue(os.path.exists("./public/index.css"))
+        self.assertFalse(os.path.exists("./public/template.html"))
+        self.assertFalse(os.path.exists("./public/blog/index.md"))
+
+    def test_linked_build_matches_copied_build(self):
+        expected = self.clean_build()
+        with contextlib.redirect_stdout(io.StringIO()):
+            build_incremental(
+                "./static",
+                "./static/template.html",
+                "./public",
+                "./.cache/manifest.json",
+                link=True,
+            )
+        self.assertEqual(snapshot("./public"), expected)
+        self.assertEqual(os.stat("./static/index.css").st_ino, os.stat("./public/index.css").st_ino)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import build
+from rendercache import RenderCache
+from search import PageText
+from test_search import page_document
+
+
+class TestRenderCache(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.cache = RenderCache(os.path.join(self.temp.name, "render"), max_bytes=200)
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def test_miss(self):
+        self.assertIsNone(self.cache.get(self.cache.key("# Title")))
+
+    def test_put_get(self):
+        key = self.cache.key("# Title\n\nBody")
+        self.cache.put(key, "Title", "<div><p>Body</p></div>", {"description": "A page"})
+        self.assertEqual(self.cache.get(key), ("Title", "<div><p>Body</p></div>", {"description": "A page"}, None))
+
+    def test_key_depends_on_content(self):
+        self.assertEqual(self.cache.key("# A"), self.cache.key("# A"))
+        self.assertNotEqual(self.cache.key("# A"), self.cache.key("# B"))
+
+    def test_key_depends_on_parser_version(self):
+        key = self.cache.key("# A")
+        with mock.patch("rendercache.PARSER_VERSION", -1):
+            self.assertNotEqual(self.cache.key("# A"), key)
+
+    def test_corrupt_entry_is_a_miss(self):
+        key = self.cache.key("# Title")
+        self.cache.put(key, "Title", "<div></div>")
+        with open(self.cache.entry_path(key), "w") as file:
+            file.write("{\"title\":")
+        self.assertIsNone(self.cache.get(key))
+
+    def test_prune_evicts_least_recently_used(self):
+        keys = [self.cache.key(str(i)) for i in range(4)]
+        for i, key in enumerate(keys):
+            self.cache.put(key, "Title", "x" * 40)
+            os.utime(self.cache.entry_path(key), (1000 + i, 1000 + i))
+        # Reading the oldest entry makes it the most recently used one
+        self.cache.get(keys[0])
+
+        self.assertEqual(self.cache.prune(), 2)
+        self.assertIsNotNone(self.cache.get(keys[0]))
+        self.assertIsNone(self.cache.get(keys[1]))
+        self.assertIsNone(self.cache.get(keys[2]))
+        self.assertIsNotNone(self.cache.get(keys[3]))
+
+    def test_clear(self):
+        key = self.cache.key("# Title")
+        self.cache.put(key, "Title", "<div></div>")
+        self.cache.clear()
+        self.assertIsNone(self.cache.get(key))
+
+    def test_render_cached_skips_parsing_on_hit(self):
+        markdown = "---\nauthor: Ann\n---\n# Title\n\nSome *body*."
+        self.assertEqual(
+            build.render_cached(markdown, self.cache),
+            ("Title", "<div><p>Some <i>body</i>.</p></div>", {"author": "Ann"}),
+        )
+        with mock.patch("build.parse_markdown", side_effect=AssertionError):
+            self.assertEqual(
+                build.render_cached(markdown, self.cache),
+                ("Title", "<div><p>Some <i>body</i>.</p></div>", {"author": "Ann"}),
+            )
+
+    def test_render_cached_keeps_page_text(self):
+        markdown = "# Title\n\n## A [link](/x)\n\nSome *body*."
+        # An entry cached without text is rendered once more to add it
+        build.render_cached(markdown, self.cache)
+        page_text = PageText()
+        build.render_cached(markdown, self.cache, page_text)
+        self.assertEqual(page_text.document("Title", {}), page_document(markdown))
+
+        page_text = PageText()
+        with mock.patch("build.parse_markdown", side_effect=AssertionError):
+            build.render_cached(markdown, self.cache, page_text)
+        self.assertEqual(page_text.document("Title", {}), page_document(markdown))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import contextlib
+import io
+import json
+import os
+import unittest
+
+from build import build_incremental
+from discover import SiteIndex
+from htmlnode import block_entry_size, parse_markdown
+from lru import LRUCache
+from search import PageText, SearchIndex, encode_postings, load_search_index
+from test_main import SiteTestCase, snapshot, write
+
+
+def page_document(markdown):
+    # For a page that isn't being rendered, parses it without serializing
+    page_text = PageText()
+    title, node, fields = parse_markdown(io.StringIO(markdown), page_text=page_text)
+    for _ in node.children:
+        pass
+    return page_text.document(title, fields)
+
+
+class TestPageDocument(unittest.TestCase):
+    def test_document(self):
+        markdown = "# The Title\n\n## Some **Heading**\n\nA [link](/x) and `code`.\n\n```\nraw # line\n```"
+        document = page_document(markdown)
+        self.assertEqual(document["title"], "The Title")
+        self.assertEqual(document["headings"], ["Some Heading"])
+        self.assertEqual(document["terms"]["the"], [0])
+        self.assertEqual(document["terms"]["heading"], [3])
+        self.assertIn("link", document["terms"])
+        self.assertNotIn("x", document["terms"])
+        self.assertIn("raw", document["terms"])
+
+    def test_cached_blocks_keep_text(self):
+        markdown = "# Title\n\n## A [link](/x)\n\n* ![alt](/y.png)\n\nSome *body*."
+        cache = LRUCache(1000, block_entry_size)
+        documents = []
+        for _ in range(2):
+            page_text = PageText()
+            title, node, fields = parse_markdown(io.StringIO(markdown), cache, page_text)
+            node.to_html()
+            documents.append(page_text.document(title, fields))
+        self.assertEqual(cache.hits, 3)
+        self.assertEqual(documents[0], page_document(markdown))
+        self.assertEqual(documents[1], documents[0])
+        self.assertEqual(documents[1]["links"], [("link", "/x"), ("image", "/y.png")])
+
+    def test_encode_postings(self):
+        self.assertEqual(encode_postings(3, [4, 10, 11]), [3, 4, 6, 1])
+
+
+class TestSearchBuild(SiteTestCase):
+    def build_search(self):
+        search = load_search_index("./public", "./.cache/search.json")
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            build_incremental(
+                "./static",
+                "./static/template.html",
+                "./public",
+                "./.cache/manifest.json",
+                collectors=[search],
+            )
+        return output.getvalue()
+
+    def shards(self):
+        return snapshot("./public/search")
+
+    def fresh_shards(self):
+        # What a build from scratch writes for the current sources
+        for path in "./.cache/manifest.json", "./.cache/search.json":
+            os.remove(path)
+        self.build_search()
+        return self.shards()
+
+    def test_pages(self):
+        self.build_search()
+        with open("./public/search/pages.json") as file:
+            pages = json.load(file)["pages"]
+        self.assertEqual(sorted(page[0] for page in pages), ["/", "/blog/"])
+        with open("./public/search/we.json") as file:
+            self.assertIn("welcome", json.load(file))
+
+    def test_changed_page_updates_its_postings(self):
+        self.build_search()
+        write("./static/blog/index.md", "# Blog\n\nWelcome to a zebra.")
+        output = self.build_search()
+        self.assertEqual(output.count("Generating page"), 1)
+        self.assertTrue(os.path.exists("./public/search/ze.json"))
+        self.assertFalse(os.path.exists("./public/search/se.json"))
+        self.assertEqual(self.shards(), self.fresh_shards())
+
+    def test_removed_page_is_dropped(self):
+        self.build_search()
+        os.remove("./static/blog/index.md")
+        self.build_search()
+        with open("./public/search/pages.json") as file:
+            pages = json.load(file)["pages"]
+        self.assertEqual([page[0] for page in pages if page], ["/"])
+        self.assertFalse(os.path.exists("./public/search/bl.json"))
+
+    def test_existing_build_gets_indexed(self):
+        self.build()
+        output = self.build_search()
+        self.assertEqual(output.count("Generating page"), 2)
+
+    def test_page_changed_without_search_is_indexed_again(self):
+        self.build_search()
+        write("./static/blog/index.md", "# Blog\n\nWelcome to a zebra.")
+        self.build()
+        output = self.build_search()
+        self.assertEqual(output.count("Generating page"), 1)
+        self.assertTrue(os.path.exists("./public/search/ze.json"))
+        self.assertEqual(self.build_search().count("Generating page"), 0)
+        self.assertEqual(self.shards(), self.fresh_shards())
+
+    def test_state_without_index_starts_over(self):
+        self.build_search()
+        os.remove("./public/search/pages.json")
+        self.assertFalse("./static/blog/index.md" in load_search_index("./public", "./.cache/search.json"))
+
+    def test_ids_are_reused(self):
+        search = SearchIndex("./public")
+        document = page_document("# A\n\nText")
+        search.add("a.md", "./public/a.html", document)
+        search.add("b.md", "./public/b.html", document)
+        search.remove("a.md")
+        search.add("c.md", "./public/c.html", document)
+        search.save(SiteIndex())
+        with open("./public/search/pages.json") as file:
+            pages = json.load(file)["pages"]
+        self.assertEqual([page[0] for page in pages], ["/c.html", "/b.html"])
+
+
+if __name__ == "__main__":
+    unittest.main()
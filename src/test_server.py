@@ -0,0 +1,265 @@
+import email.utils
+import functools
+import gzip
+import http.client
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+# server.py lives in the repository root, next to src
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server import FileCache, KeepAliveHandler, PooledHTTPServer, accepts_encoding
+from test_main import write
+
+
+class ServerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.directory = self.temp.name
+        write(os.path.join(self.directory, "index.html"), "<h1>Home</h1>")
+        write(os.path.join(self.directory, "blog", "index.html"), "<h1>Blog</h1>")
+        self.server = None
+
+    def tearDown(self):
+        if self.server is not None:
+            self.stop()
+        self.temp.cleanup()
+
+    def start(self, workers=2, file_cache=None):
+        # Port 0 picks a free ephemeral port
+        handler = functools.partial(KeepAliveHandler, directory=self.directory)
+        self.server = PooledHTTPServer(("127.0.0.1", 0), handler, workers, quiet=True)
+        if file_cache is not None:
+            self.server.file_cache = file_cache
+        self.port = self.server.server_address[1]
+        # A short poll interval keeps shutdown() from adding half a second per test
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,))
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+        self.server = None
+
+    def connect(self):
+        connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+        self.addCleanup(connection.close)
+        return connection
+
+    def get(self, connection, path, headers=None):
+        connection.request("GET", path, headers=headers or {})
+        response = connection.getresponse()
+        return response, response.read()
+
+    def wait_for(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail("timed out waiting for the server")
+            time.sleep(0.01)
+
+    def raw_socket(self):
+        client = socket.create_connection(("127.0.0.1", self.port), timeout=5)
+        self.addCleanup(client.close)
+        return client
+
+    def read_response(self, client):
+        # Headers and body may arrive in separate segments
+        response = http.client.HTTPResponse(client)
+        response.begin()
+        return response.status, response.read()
+
+
+class TestKeepAlive(ServerTestCase):
+    def test_requests_share_a_connection(self):
+        self.start()
+        connection = self.connect()
+        response, body = self.get(connection, "/")
+        self.assertEqual((response.status, body), (200, b"<h1>Home</h1>"))
+        sock = connection.sock
+        response, body = self.get(connection, "/blog/")
+        self.assertEqual((response.status, body), (200, b"<h1>Blog</h1>"))
+        # http.client opens a new socket whenever the server closed the old one
+        self.assertIs(connection.sock, sock)
+
+    def test_idle_connection_doesnt_hold_the_worker(self):
+        self.start(workers=1)
+        idle = self.connect()
+        self.get(idle, "/")
+        # The only worker is free again while the first connection waits
+        response, _ = self.get(self.connect(), "/blog/")
+        self.assertEqual(response.status, 200)
+        sock = idle.sock
+        response, _ = self.get(idle, "/blog/")
+        self.assertEqual(response.status, 200)
+        self.assertIs(idle.sock, sock)
+
+    def test_slow_client_doesnt_block_others(self):
+        self.start(workers=2)
+        slow = self.raw_socket()
+        slow.sendall(b"GET / HTTP/1.1\r\nHost: localhost\r\n")
+        start = time.monotonic()
+        response, body = self.get(self.connect(), "/blog/")
+        self.assertEqual((response.status, body), (200, b"<h1>Blog</h1>"))
+        self.assertLess(time.monotonic() - start, 1)
+        # The slow request is still answered once it is complete
+        slow.sendall(b"\r\n")
+        self.assertEqual(self.read_response(slow), (200, b"<h1>Home</h1>"))
+
+    def test_shutdown_drains_requests_in_flight(self):
+        self.start()
+        slow = self.raw_socket()
+        slow.sendall(b"GET /blog/ HTTP/1.1\r\nHost: localhost\r\n\r\n")
+        self.assertEqual(self.read_response(slow), (200, b"<h1>Blog</h1>"))
+        # Parked between requests, then taken back by a worker once the next
+        # request starts arriving
+        self.wait_for(lambda: self.server.idle)
+        slow.sendall(b"GET / HTTP/1.1\r\nHost: localhost\r\n")
+        self.wait_for(lambda: not self.server.idle)
+        stopping = threading.Thread(target=self.stop)
+        stopping.start()
+        time.sleep(0.1)
+        self.assertTrue(stopping.is_alive())
+
+        slow.sendall(b"\r\n")
+        self.assertEqual(self.read_response(slow), (200, b"<h1>Home</h1>"))
+        stopping.join()
+        # Kept alive until then, the connection is closed with the server
+        self.assertEqual(slow.recv(4096), b"")
+        self.assertRaises(OSError, socket.create_connection, ("127.0.0.1", self.port), 1)
+
+
+class TestConditionalRequests(ServerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.directory, "index.html")
+        # Old enough that Last-Modified is in the past
+        os.utime(self.path, (time.time() - 3600, time.time() - 3600))
+        self.start(file_cache=FileCache())
+        self.connection = self.connect()
+
+    def test_strong_etag(self):
+        response, _ = self.get(self.connection, "/")
+        etag = response.getheader("ETag")
+        self.assertRegex(etag, r'^"[0-9a-f]+"$')
+        # Taken from the content, rewriting the same bytes keeps it
+        write(self.path, "<h1>Home</h1>")
+        response, _ = self.get(self.connection, "/")
+        self.assertEqual(response.getheader("ETag"), etag)
+        self.assertEqual(response.getheader("Cache-Control"), "no-cache")
+
+    def test_if_none_match(self):
+        response, _ = self.get(self.connection, "/")
+        etag = response.getheader("ETag")
+        for tag in (etag, f'"other", {etag}', f"W/{etag}", "*"):
+            response, body = self.get(self.connection, "/", {"If-None-Match": tag})
+            self.assertEqual((response.status, body), (304, b""), tag)
+            self.assertEqual(response.getheader("ETag"), etag)
+        response, body = self.get(self.connection, "/", {"If-None-Match": '"other"'})
+        self.assertEqual((response.status, body), (200, b"<h1>Home</h1>"))
+
+    def test_if_modified_since(self):
+        response, _ = self.get(self.connection, "/")
+        last_modified = response.getheader("Last-Modified")
+        response, body = self.get(self.connection, "/", {"If-Modified-Since": last_modified})
+        self.assertEqual((response.status, body), (304, b""))
+        earlier = email.utils.formatdate(time.time() - 7200, usegmt=True)
+        response, _ = self.get(self.connection, "/", {"If-Modified-Since": earlier})
+        self.assertEqual(response.status, 200)
+        # If-None-Match wins over If-Modified-Since
+        headers = {"If-None-Match": '"other"', "If-Modified-Since": last_modified}
+        response, _ = self.get(self.connection, "/", headers)
+        self.assertEqual(response.status, 200)
+
+    def test_changed_file_invalidates(self):
+        response, _ = self.get(self.connection, "/")
+        etag = response.getheader("ETag")
+        # What a rebuild under --dir does
+        write(self.path, "<h1>Home, rebuilt</h1>")
+        response, body = self.get(self.connection, "/", {"If-None-Match": etag})
+        self.assertEqual((response.status, body), (200, b"<h1>Home, rebuilt</h1>"))
+        self.assertNotEqual(response.getheader("ETag"), etag)
+        response, _ = self.get(self.connection, "/", {"If-None-Match": response.getheader("ETag")})
+        self.assertEqual(response.status, 304)
+
+    def test_without_file_cache(self):
+        self.stop()
+        self.start()
+        connection = self.connect()
+        response, _ = self.get(connection, "/")
+        etag = response.getheader("ETag")
+        self.assertRegex(etag, r'^"[0-9a-f]+-[0-9a-f]+"$')
+        response, _ = self.get(connection, "/", {"If-None-Match": etag})
+        self.assertEqual(response.status, 304)
+        write(self.path, "<h1>Home, rebuilt</h1>")
+        response, body = self.get(connection, "/", {"If-None-Match": etag})
+        self.assertEqual((response.status, body), (200, b"<h1>Home, rebuilt</h1>"))
+
+
+class TestAcceptsEncoding(unittest.TestCase):
+    def test_accepts_encoding(self):
+        self.assertTrue(accepts_encoding("gzip, deflate, br", "gzip"))
+        self.assertTrue(accepts_encoding("br;q=1.0, GZIP;q=0.5", "gzip"))
+        self.assertTrue(accepts_encoding("br, *", "gzip"))
+        self.assertFalse(accepts_encoding("gzip;q=0", "gzip"))
+        self.assertFalse(accepts_encoding("*;q=0", "gzip"))
+        self.assertFalse(accepts_encoding("br", "gzip"))
+        self.assertFalse(accepts_encoding(None, "gzip"))
+
+
+class TestCompressedVariants(ServerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.directory, "index.html")
+        with open(self.path + ".gz", "wb") as file:
+            file.write(gzip.compress(b"<h1>Home</h1>"))
+        # Stamped like the build stamps its .gz siblings, an hour ago so a
+        # rewrite always moves the page's mtime away from it
+        mtime_ns = time.time_ns() - 3600 * 10 ** 9
+        os.utime(self.path, ns=(mtime_ns, mtime_ns))
+        os.utime(self.path + ".gz", ns=(mtime_ns, mtime_ns))
+        self.start(file_cache=FileCache())
+        self.connection = self.connect()
+
+    def test_gzip_when_accepted(self):
+        response, body = self.get(self.connection, "/", {"Accept-Encoding": "br, gzip"})
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.getheader("Content-Encoding"), "gzip")
+        self.assertEqual(response.getheader("Vary"), "Accept-Encoding")
+        self.assertEqual(response.getheader("Content-type"), "text/html")
+        self.assertEqual(int(response.getheader("Content-Length")), len(body))
+        self.assertEqual(gzip.decompress(body), b"<h1>Home</h1>")
+
+    def test_identity_when_not_accepted(self):
+        for headers in ({}, {"Accept-Encoding": "gzip;q=0, br"}, {"Accept-Encoding": "identity"}):
+            response, body = self.get(self.connection, "/", headers)
+            self.assertEqual(body, b"<h1>Home</h1>", headers)
+            self.assertIsNone(response.getheader("Content-Encoding"))
+            # The response still depends on the header
+            self.assertEqual(response.getheader("Vary"), "Accept-Encoding")
+
+    def test_variants_have_their_own_etags(self):
+        response, _ = self.get(self.connection, "/", {"Accept-Encoding": "gzip"})
+        gzip_etag = response.getheader("ETag")
+        response, _ = self.get(self.connection, "/")
+        self.assertNotEqual(response.getheader("ETag"), gzip_etag)
+        response, _ = self.get(self.connection, "/", {"Accept-Encoding": "gzip", "If-None-Match": gzip_etag})
+        self.assertEqual(response.status, 304)
+        self.assertEqual(response.getheader("Vary"), "Accept-Encoding")
+
+    def test_stale_variant_is_ignored(self):
+        write(self.path, "<h1>Home, rebuilt</h1>")
+        response, body = self.get(self.connection, "/", {"Accept-Encoding": "gzip"})
+        self.assertEqual(body, b"<h1>Home, rebuilt</h1>")
+        self.assertIsNone(response.getheader("Content-Encoding"))
+        self.assertIsNone(response.getheader("Vary"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+from main import parse_args
+from shard import build_shard, merge_shards, parse_shard, shard_of
+from test_main import SiteTestCase, snapshot, write
+
+MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+
+class TestPartition(unittest.TestCase):
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("1/4"), (1, 4))
+        self.assertEqual(parse_shard("4/4"), (4, 4))
+        self.assertRaises(ValueError, parse_shard, "0/4")
+        self.assertRaises(ValueError, parse_shard, "5/4")
+        self.assertRaises(ValueError, parse_shard, "4")
+
+    def test_flags_rejected_with_shard(self):
+        for flag in ("--profile", "--pipeline", "--watch", "--incremental", "--merge", "--precompress"):
+            with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+                parse_args(["--shard", "1/2", flag])
+
+    def test_shard_of(self):
+        paths = [f"./static/blog/post{i}.md" for i in range(100)]
+        shards = [shard_of(path, "./static", 4) for path in paths]
+        self.assertEqual(set(shards), {1, 2, 3, 4})
+        # Only the path below the static directory counts
+        self.assertEqual(shards, [shard_of(path.replace("./static", "/srv/site/static"), "/srv/site/static", 4) for path in paths])
+
+
+class TestShardedBuild(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(10):
+            write(f"./static/blog/post{i}.md", f"# Post {i}\n\nText {i}.")
+        os.makedirs("./static/empty")
+
+    def build_shards(self, count, indexes=None):
+        with contextlib.redirect_stdout(io.StringIO()):
+            for index in indexes or range(1, count + 1):
+                build_shard("./static", "./static/template.html", "./public", "./shards", index, count)
+
+    def merge(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            merge_shards("./static", "./static/template.html", "./public", "./shards")
+
+    def test_merge_matches_clean_build(self):
+        expected = self.clean_build()
+        self.build_shards(3)
+        self.merge()
+        self.assertEqual(snapshot("./public"), expected)
+
+    def test_missing_shard(self):
+        self.build_shards(3, [1, 3])
+        with self.assertRaisesRegex(ValueError, "shard 2/3 is missing"):
+            self.merge()
+
+    def test_mixed_shard_counts(self):
+        self.build_shards(2)
+        self.build_shards(3, [1])
+        # The shards of the earlier run are gone, not mixed in
+        self.assertEqual(sorted(os.listdir("./shards")), ["1-of-3", "1-of-3.json"])
+        with self.assertRaisesRegex(ValueError, "shard 2/3 is missing"):
+            self.merge()
+        self.build_shards(3, [2, 3])
+        self.merge()
+        self.assertEqual(snapshot("./public"), self.clean_build())
+
+    def test_page_built_twice(self):
+        self.build_shards(2)
+        with open("./shards/1-of-2.json") as file:
+            first = json.load(file)
+        with open("./shards/2-of-2.json") as file:
+            second = json.load(file)
+        second["manifest"]["pages"].update(first["manifest"]["pages"])
+        with open("./shards/2-of-2.json", "w") as file:
+            json.dump(second, file)
+        with self.assertRaisesRegex(ValueError, "was built by shards 1 and 2"):
+            self.merge()
+
+    def test_output_collision(self):
+        # Content directories are flattened, both pages write index.html
+        write("./static/content/more/index.md", "# More\n\nText.")
+        self.build_shards(2)
+        with self.assertRaisesRegex(ValueError, "both write index.html"):
+            self.merge()
+
+    def test_changed_and_new_pages(self):
+        self.build_shards(2)
+        write("./static/blog/post0.md", "# Post 0\n\nEdited.")
+        write("./static/blog/new.md", "# New\n\nText.")
+        with self.assertRaises(ValueError) as context:
+            self.merge()
+        self.assertIn("./static/blog/post0.md changed after shard", str(context.exception))
+        self.assertIn("./static/blog/new.md wasn't built by any shard", str(context.exception))
+
+    def test_shard_processes(self):
+        expected = self.clean_build()
+        processes = [
+            subprocess.Popen([sys.executable, MAIN, "--shard", f"{index}/4"], stdout=subprocess.DEVNULL)
+            for index in range(1, 5)
+        ]
+        for process in processes:
+            self.assertEqual(process.wait(), 0)
+        subprocess.run([sys.executable, MAIN, "--merge"], check=True, stdout=subprocess.DEVNULL)
+        self.assertEqual(snapshot("./public"), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+
+from htmlnode import ParentNode, LeafNode
+from template import Template, load_template, clear_template_cache
+
+
+class TestTemplate(unittest.TestCase):
+    def test_segments(self):
+        template = Template("<title>{{ Title }}</title>{{Content}}!")
+        self.assertEqual(template.segments, ["<title>", "Title", "</title>", "Content", "!"])
+
+    def test_render(self):
+        template = Template("<title> {{ Title }} </title><article>{{ Content }}</article>")
+        self.assertEqual(
+            template.render({"Title": "Home", "Content": "<p>Hi</p>"}),
+            "<title> Home </title><article><p>Hi</p></article>",
+        )
+
+    def test_render_repeated_placeholder(self):
+        template = Template("{{ Title }} - {{ Title }}")
+        self.assertEqual(template.render({"Title": "Home"}), "Home - Home")
+
+    def test_render_unknown_placeholder(self):
+        template = Template("{{ Title }} by {{  Author }}")
+        self.assertEqual(template.render({"Title": "Home"}), "Home by {{  Author }}")
+
+    def test_render_values_are_not_reparsed(self):
+        template = Template("{{ Title }}{{ Content }}")
+        self.assertEqual(template.render({"Title": "{{ Content }}", "Content": "x"}), "{{ Content }}x")
+
+    def test_render_html_node(self):
+        template = Template("<article>{{ Content }}</article>")
+        node = ParentNode("p", [LeafNode("b", "Hi")])
+        self.assertEqual(template.render({"Content": node}), "<article><p><b>Hi</b></p></article>")
+
+    def test_render_type_error(self):
+        template = Template("{{ Title }}")
+        self.assertRaises(TypeError, template.render, ["Title"])
+
+    def test_source_type_error(self):
+        self.assertRaises(TypeError, Template, None)
+
+
+class TestLoadTemplate(unittest.TestCase):
+    def setUp(self):
+        clear_template_cache()
+        self.temp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp.name, "template.html")
+        with open(self.path, "w") as file:
+            file.write("<h1>{{ Title }}</h1>")
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def test_cached(self):
+        self.assertIs(load_template(self.path), load_template(self.path))
+
+    def test_reloaded_on_change(self):
+        first = load_template(self.path)
+        with open(self.path, "w") as file:
+            file.write("<h2>{{ Title }}</h2>!")
+        second = load_template(self.path)
+        self.assertIsNot(first, second)
+        self.assertEqual(second.render({"Title": "Home"}), "<h2>Home</h2>!")
+
+
+if __name__ == "__main__":
+    unittest.main()
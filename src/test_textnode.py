@@ -1,3 +1,4 @@
+import random
 import unittest
 
 from textnode import (
@@ -39,6 +40,50 @@ class TestTextNode(unittest.TestCase):
         ]
         self.assertEqual(text_to_text_nodes(text), result)
 
+    def test_text_to_text_nodes_bold_and_italic(self):
+        text = "One *italic* word and **bold** words and `*code*`"
+        result = [
+            TextNode("One ", TextType.TEXT),
+            TextNode("italic", TextType.ITALIC),
+            TextNode(" word and ", TextType.TEXT),
+            TextNode("bold", TextType.BOLD),
+            TextNode(" words and ", TextType.TEXT),
+            TextNode("*code*", TextType.CODE),
+        ]
+        self.assertEqual(text_to_text_nodes(text), result)
+
+    def test_text_to_text_nodes_plain(self):
+        self.assertEqual(text_to_text_nodes(""), [TextNode("", TextType.TEXT)])
+        text = "Plain text with a ! and [brackets] and (parens) and ![broken](image"
+        self.assertEqual(text_to_text_nodes(text), [TextNode(text, TextType.TEXT)])
+
+    def test_text_to_text_nodes_fast_path(self):
+        for text in ["Wow! No markup at all.", "x" * 10000, "Tabs\tand\nnewlines"]:
+            self.assertEqual(text_to_text_nodes(text), [TextNode(text, TextType.TEXT)])
+        self.assertEqual(
+            text_to_text_nodes("Hi! ![a](b)"),
+            [TextNode("Hi! ", TextType.TEXT), TextNode("a", TextType.IMAGE, "b")],
+        )
+
+    def test_text_to_text_nodes_many_spans(self):
+        text = "a **b** " * 5000
+        nodes = text_to_text_nodes(text)
+        self.assertEqual(len(nodes), 10001)
+        self.assertEqual(nodes[-2], TextNode("b", TextType.BOLD))
+
+    def test_text_to_text_nodes_links_across_lines(self):
+        text = "[a](/1) [b](/2)\n[broken\n[c](/3)"
+        self.assertEqual(text_to_text_nodes(text), [
+            TextNode("a", TextType.LINK, "/1"),
+            TextNode(" ", TextType.TEXT),
+            TextNode("b", TextType.LINK, "/2"),
+            TextNode("\n[broken\n", TextType.TEXT),
+            TextNode("c", TextType.LINK, "/3"),
+        ])
+        # A long line of links only looks for its end once
+        nodes = text_to_text_nodes("[x](/y) " * 5000 + "\n" + "z" * 100000)
+        self.assertEqual(len(nodes), 10000)
+
     def test_split_nodes_diff_delimiters(self):
         node = TextNode("This text has `code block` and **bold sentence**.", TextType.TEXT)
         result = [
@@ -151,5 +196,48 @@ class TestTextNode(unittest.TestCase):
         self.assertEqual(extract_markdown_links(text), [("link", "https://www.example.com")])
 
 
+def chained_text_to_text_nodes(text):
+    # The multi-pass pipeline text_to_text_nodes used to be
+    nodes = split_nodes_delimiter([TextNode(text, TextType.TEXT)], "**", TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, "*", TextType.ITALIC)
+    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = split_nodes_image(nodes)
+    return split_nodes_link(nodes)
+
+
+class TestInlineScannerDifferential(unittest.TestCase):
+    WORDS = ["lorem", "ipsum", "dolor", "sit", "amet,", "elit.", "x", "2 + 2", "a-b", "done;"]
+
+    def random_text(self, rng):
+        words = lambda: " ".join(rng.choice(self.WORDS) for _ in range(rng.randint(1, 3)))
+        spans = [
+            lambda: f"**{words()}**",
+            lambda: f"*{words()}*",
+            lambda: f"`{words()}`",
+            lambda: f"![{words()}](/images/{rng.randint(0, 99)}.png)",
+            lambda: f"[{words()}](https://example.com/{rng.randint(0, 99)})",
+            lambda: f"[]({rng.choice(self.WORDS)})",
+        ]
+        parts = []
+        for _ in range(rng.randint(0, 8)):
+            if rng.random() < 0.5:
+                parts.append(rng.choice(spans)())
+            else:
+                parts.append(words())
+        # Spans are always separated, "**a***b*" is ambiguous in the old passes
+        return " ".join(parts)
+
+    def test_matches_chained_passes(self):
+        rng = random.Random(1234)
+        for _ in range(2000):
+            text = self.random_text(rng)
+            self.assertEqual(text_to_text_nodes(text), chained_text_to_text_nodes(text), text)
+
+    def test_matches_chained_passes_on_errors(self):
+        for text in ["a **b", "a *b", "`a", "a **b** *c"]:
+            self.assertRaises(Exception, chained_text_to_text_nodes, text)
+            self.assertRaises(Exception, text_to_text_nodes, text)
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
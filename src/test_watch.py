@@ -0,0 +1,94 @@
+import contextlib
+import io
+import os
+import unittest
+
+from test_main import SiteTestCase, snapshot, write
+from watch import InotifyWatcher, PollingWatcher, Rebuilder
+
+
+class TestRebuilder(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.build()
+        self.rebuilder = Rebuilder("./static", "./static/template.html", "./public", "./.cache/manifest.json")
+
+    def rebuild(self, *changed):
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            result = self.rebuilder.rebuild(set(changed))
+        return result, output.getvalue()
+
+    def test_markdown_change_renders_one_page(self):
+        write("./static/blog/index.md", "# Blog\n\nChanged.")
+        result, output = self.rebuild("./static/blog/index.md")
+        self.assertEqual(result, (1, 1))
+        self.assertNotIn("./static/content/index.md", output)
+        self.assertEqual(snapshot("./public"), self.clean_build())
+
+    def test_template_change_renders_every_page(self):
+        write("./static/template.html", "<h1>{{ Title }}</h1>{{ Content }}")
+        result, _ = self.rebuild("./static/template.html")
+        self.assertEqual(result, (2, 1))
+        self.assertEqual(snapshot("./public"), self.clean_build())
+
+    def test_asset_change_copies_one_file(self):
+        write("./static/index.css", "body { color: red; }")
+        result, output = self.rebuild("./static/index.css")
+        self.assertEqual(result, (0, 1))
+        self.assertEqual(output, "")
+        self.assertEqual(snapshot("./public"), self.clean_build())
+
+    def test_new_and_removed_pages(self):
+        write("./static/news/index.md", "# News\n\nFresh.")
+        self.rebuild("./static/news", "./static/news/index.md")
+        self.assertEqual(snapshot("./public"), self.clean_build())
+
+        os.remove("./static/blog/index.md")
+        os.rmdir("./static/blog")
+        self.rebuild("./static/blog")
+        self.assertEqual(snapshot("./public"), self.clean_build())
+
+    def test_incremental_build_after_rebuild(self):
+        write("./static/news/index.md", "# News\n\nFresh.")
+        write("./static/news/photo.png", "pixels")
+        self.rebuild("./static/news", "./static/news/index.md", "./static/news/photo.png")
+        # Everything rendered by the rebuild is in the manifest
+        self.assertNotIn("Generating", self.build())
+
+        os.remove("./static/news/index.md")
+        os.remove("./static/news/photo.png")
+        os.rmdir("./static/news")
+        output = self.build()
+        self.assertIn("Removing stale output ./public/news/index.html", output)
+        self.assertEqual(snapshot("./public"), self.clean_build())
+
+
+class TestWatchers(SiteTestCase):
+    def check_watcher(self, watcher):
+        try:
+            write("./static/index.css", "body { color: blue; }")
+            write("./static/new/page.md", "# New\n\nPage.")
+            changed = set()
+            for _ in range(10):
+                changed |= watcher.poll(0.2)
+                if "./static/new/page.md" in changed and "./static/index.css" in changed:
+                    break
+            self.assertIn("./static/index.css", changed)
+            self.assertIn("./static/new/page.md", changed)
+            self.assertEqual(watcher.poll(0.05), set())
+        finally:
+            watcher.close()
+
+    def test_polling_watcher(self):
+        self.check_watcher(PollingWatcher("./static", interval=0.01))
+
+    def test_inotify_watcher(self):
+        try:
+            watcher = InotifyWatcher("./static")
+        except OSError:
+            self.skipTest("inotify is not available")
+        self.check_watcher(watcher)
+
+
+if __name__ == "__main__":
+    unittest.main()
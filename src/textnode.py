@@ -2,6 +2,11 @@ from enum import Enum
 import re
 
 
+INLINE_MARKUP_PATTERN = re.compile(r"[*`!\[]")
+IMAGE_PATTERN = re.compile(r"!\[(.*?)\]\((.*?)\)")
+LINK_PATTERN = re.compile(r"\[(.*?)\]\((.*?)\)")
+
+
 class TextType(Enum):
     TEXT = 1
     BOLD = 2
@@ -12,6 +17,8 @@ class TextType(Enum):
 
 
 class TextNode():
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text, text_type, url=None):
         self.text = text
         self.text_type = text_type
@@ -31,12 +38,70 @@ class TextNode():
 
 
 def text_to_text_nodes(text):
-    nodes = TextNode(text, TextType.TEXT)
-    nodes = split_nodes_delimiter([nodes], "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "*", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
+    # Most text has no markup at all, and substring checks are much faster
+    # than a regex search. "!" only starts markup in front of "["
+    if "*" not in text and "`" not in text and "[" not in text:
+        return [TextNode(text, TextType.TEXT)]
+
+    # Single left-to-right scan, every character is looked at a bounded number
+    # of times. Spans don't nest, their content is taken literally.
+    nodes = []
+    start = 0 # Start of the plain text that hasn't been emitted yet
+    position = 0
+    no_link_until = -1 # No complete [text](url) starts before this index
+    line_end = -1 # End of the line the last link candidate was on, each is found once
+    while True:
+        match = INLINE_MARKUP_PATTERN.search(text, position)
+        if not match:
+            break
+        i = match.start()
+        symbol = text[i]
+
+        if symbol == "*" or symbol == "`":
+            if symbol == "`":
+                delimiter, text_type = "`", TextType.CODE
+            elif text.startswith("**", i):
+                delimiter, text_type = "**", TextType.BOLD
+            else:
+                delimiter, text_type = "*", TextType.ITALIC
+            end = text.find(delimiter, i + len(delimiter))
+            if end == -1:
+                raise Exception("Invalid markdown syntax, missing closing delimiter?")
+            if i > start:
+                nodes.append(TextNode(text[start:i], TextType.TEXT))
+            nodes.append(TextNode(text[i + len(delimiter):end], text_type))
+            position = start = end + len(delimiter)
+            continue
+
+        is_image = symbol == "!"
+        bracket = i + 1 if is_image else i
+        if (is_image and not text.startswith("[", bracket)) or bracket < no_link_until:
+            position = i + 1
+            continue
+
+        if line_end < bracket:
+            line_end = text.find("\n", bracket)
+            if line_end == -1:
+                line_end = len(text)
+        middle = text.find("](", bracket + 1, line_end)
+        close = text.find(")", middle + 2, line_end) if middle != -1 else -1
+        if close == -1:
+            # Every later bracket on this line would fail the same way
+            no_link_until = line_end
+            position = i + 1
+            continue
+
+        if i > start:
+            nodes.append(TextNode(text[start:i], TextType.TEXT))
+        nodes.append(TextNode(
+            text[bracket + 1:middle],
+            TextType.IMAGE if is_image else TextType.LINK,
+            text[middle + 2:close],
+        ))
+        position = start = close + 1
+
+    if start < len(text) or not nodes:
+        nodes.append(TextNode(text[start:], TextType.TEXT))
     return nodes
 
 
@@ -52,14 +117,13 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
 
     new_nodes = []
     for node in old_nodes:
-        # TODO: Fix bug when bold symbol is being confused as italic sentence
-        if node.text.count(delimiter) % 2 != 0:
-            raise Exception("Invalid markdown syntax, missing closing delimiter?")
-        elif node.text.count(delimiter) == 0 and node is not old_nodes[-1]:
+        # Splitting on "*" still sees both halves of "**", text_to_text_nodes
+        # uses the single-pass scanner which tells them apart
+        if delimiter not in node.text:
             new_nodes.append(node)
             continue
-        elif node.text.count(delimiter) == 0:
-            return old_nodes
+        if node.text.count(delimiter) % 2 != 0:
+            raise Exception("Invalid markdown syntax, missing closing delimiter?")
 
         text = node.text.split(delimiter, maxsplit=2)   
         result = []
@@ -83,12 +147,13 @@ def split_nodes_image(old_nodes):
 
     new_nodes = []
     for node in old_nodes:
+        if "![" not in node.text:
+            new_nodes.append(node)
+            continue
         images = extract_markdown_images(node.text)
-        if not images and node is not old_nodes[-1]:
+        if not images:
             new_nodes.append(node)
             continue
-        elif not images:
-            return old_nodes
 
         image_tup = images[0]
         text = node.text.split(f"![{image_tup[0]}]({image_tup[1]})", maxsplit=1)
@@ -110,12 +175,13 @@ def split_nodes_link(old_nodes):
 
     new_nodes = []
     for node in old_nodes:
+        if "](" not in node.text:
+            new_nodes.append(node)
+            continue
         links = extract_markdown_links(node.text)
-        if not links and node is not old_nodes[-1]:
+        if not links:
             new_nodes.append(node)
             continue
-        elif not links:
-            return old_nodes
 
         link_tup = links[0]
         text = node.text.split(f"[{link_tup[0]}]({link_tup[1]})", maxsplit=1)
@@ -132,8 +198,8 @@ def split_nodes_link(old_nodes):
 
 
 def extract_markdown_images(text):
-    return re.findall(r"!\[(.*?)\]\((.*?)\)", text)
+    return IMAGE_PATTERN.findall(text)
 
 
 def extract_markdown_links(text):
-    return re.findall(r"\[(.*?)\]\((.*?)\)", text)
\ No newline at end of file
+    return LINK_PATTERN.findall(text)
\ No newline at end of file
@@ -0,0 +1,339 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import shutil
+import struct
+import time
+
+from build import build_incremental, generate_pages, page_output_path, public_path
+from compress import precompress, precompress_r
+from discover import SiteIndex, discover
+from manifest import Manifest, hash_file, load_manifest, save_manifest
+from publish import is_asset, publish_file
+
+DEBOUNCE_SECONDS = 0.1
+POLL_INTERVAL_SECONDS = 0.5
+
+IN_MODIFY = 0x2
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_Q_OVERFLOW = 0x4000
+IN_ISDIR = 0x40000000
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+    IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class PollingWatcher():
+    def __init__(self, root, interval=POLL_INTERVAL_SECONDS):
+        if not os.path.isdir(root):
+            raise ValueError("root is required to be a directory")
+        self.root = root
+        self.interval = interval
+        self.snapshot = self.scan()
+
+    def scan(self):
+        result = {}
+        for directory, _, files in os.walk(self.root):
+            for file in files:
+                path = os.path.join(directory, file)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                result[path] = (stat.st_mtime_ns, stat.st_size)
+        return result
+
+    def poll(self, timeout=None):
+        # Without a timeout, block until something changes
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.interval
+            if deadline is not None:
+                wait = max(0, min(wait, deadline - time.monotonic()))
+            time.sleep(wait)
+
+            snapshot = self.scan()
+            changed = set()
+            for path in snapshot.keys() | self.snapshot.keys():
+                if snapshot.get(path) != self.snapshot.get(path):
+                    changed.add(path)
+            self.snapshot = snapshot
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher():
+    def __init__(self, root):
+        if not os.path.isdir(root):
+            raise ValueError("root is required to be a directory")
+        library = ctypes.util.find_library("c")
+        if not library:
+            raise OSError("libc is required for inotify")
+        self.libc = ctypes.CDLL(library, use_errno=True)
+        if not hasattr(self.libc, "inotify_init1"):
+            raise OSError("inotify is not supported on this platform")
+
+        self.root = root
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directories = {} # watch descriptor -> directory
+        for directory, _, _ in os.walk(root):
+            self.add_watch(directory)
+
+    def add_watch(self, directory):
+        descriptor = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if descriptor < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+        self.directories[descriptor] = directory
+
+    def poll(self, timeout=None):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 1 << 16)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                descriptor, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length]
+                offset += EVENT_HEADER.size + length
+
+                if mask & IN_Q_OVERFLOW:
+                    # Events were dropped, only a full rescan is safe
+                    changed.add(self.root)
+                    continue
+                directory = self.directories.get(descriptor)
+                if directory is None:
+                    continue
+                path = os.path.join(directory, os.fsdecode(name.rstrip(b"\0")))
+                if not name:
+                    path = directory
+                changed.add(path)
+
+                if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                    # Files can land in a new directory before it's watched
+                    for sub_directory, _, files in os.walk(path):
+                        self.add_watch(sub_directory)
+                        changed.update(os.path.join(sub_directory, file) for file in files)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+def create_watcher(root):
+    try:
+        return InotifyWatcher(root)
+    except (OSError, AttributeError):
+        return PollingWatcher(root)
+
+
+class Rebuilder():
+    def __init__(
+        self,
+        static_dir,
+        template_path,
+        public_dir,
+        manifest_path,
+        jobs=1,
+        cache=None,
+        compress=False,
+        link=False,
+        collectors=(),
+    ):
+        self.static_dir = static_dir
+        self.template_path = template_path
+        self.public_dir = public_dir
+        self.manifest_path = manifest_path
+        self.jobs = jobs
+        self.cache = cache
+        self.compress = compress
+        self.link = link
+        self.collectors = collectors
+        # Kept up to date by every rebuild, so a later --incremental build
+        # knows what was rendered here
+        self.manifest = load_manifest(manifest_path) or Manifest()
+        self.scan()
+
+    def scan(self):
+        index = discover(self.static_dir, self.public_dir, self.template_path)
+        self.files = set(index.assets + index.templates)
+        self.files.update(path for path, _ in index.pages)
+        self.pages = dict(index.pages) # source -> dest dir
+
+    def public_path(self, path):
+        return public_path(path, self.static_dir, self.public_dir)
+
+    def rebuild(self, changed):
+        if self.static_dir in changed:
+            self.manifest = build_incremental(
+                self.static_dir,
+                self.template_path,
+                self.public_dir,
+                self.manifest_path,
+                self.jobs,
+                self.cache,
+                self.link,
+                collectors=self.collectors,
+            )
+            self.scan()
+            if self.compress:
+                precompress_r(self.public_dir, self.jobs)
+            return len(self.pages), len(self.files)
+
+        removed = set()
+        removed_directories = set()
+        for path in changed:
+            if os.path.exists(path):
+                continue
+            if os.path.isdir(self.public_path(path)):
+                removed_directories.add(path)
+            # A removed or moved-away directory takes everything under it along
+            prefix = path + os.sep
+            removed.update(file for file in self.files if file == path or file.startswith(prefix))
+        updated = set(path for path in changed if os.path.isfile(path))
+        for path in changed:
+            if os.path.isdir(path):
+                os.makedirs(self.public_path(path), exist_ok=True)
+
+        if any(path.endswith(".md") and path not in self.pages for path in updated):
+            self.pages = dict(discover(self.static_dir, self.public_dir, self.template_path).pages)
+
+        for path in removed:
+            self.files.discard(path)
+            remove_file(self.public_path(path))
+            self.manifest.assets.pop(path, None)
+            self.manifest.pages.pop(path, None)
+            dest_path = self.pages.pop(path, None)
+            if dest_path is not None:
+                remove_file(page_output_path(path, dest_path))
+                for collector in self.collectors:
+                    collector.remove(path)
+        for path in removed_directories:
+            shutil.rmtree(self.public_path(path), ignore_errors=True)
+        for path in sorted(updated):
+            self.files.add(path)
+            if not is_asset(path, self.template_path):
+                continue
+            output = self.public_path(path)
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+            publish_file(path, output, self.link)
+            self.manifest.assets[path] = {"hash": hash_file(path), "output": output}
+
+        # The template is the only thing every page depends on
+        if self.template_path in updated:
+            sources = list(self.pages)
+            self.manifest.template = hash_file(self.template_path)
+        else:
+            sources = sorted(path for path in updated if path in self.pages)
+        pages = [(path, self.pages[path]) for path in sources]
+        names = sorted(collector.name for collector in self.collectors)
+        for path, dest_path in pages:
+            # Hashed before rendering, a change in between renders it again
+            self.manifest.pages[path] = {
+                "hash": hash_file(path),
+                "output": page_output_path(path, dest_path),
+                "collectors": names,
+            }
+        generate_pages(pages, self.template_path, self.jobs, self.cache, self.collectors)
+        save_manifest(self.manifest, self.manifest_path)
+        if self.collectors:
+            # The pages and assets the site has now, known without walking it
+            index = SiteIndex(
+                assets=sorted(path for path in self.files if is_asset(path, self.template_path)),
+                pages=sorted(self.pages.items()),
+            )
+            for collector in self.collectors:
+                collector.save(index)
+        if self.compress:
+            outputs = [self.public_path(path) for path in updated if is_asset(path, self.template_path)]
+            outputs.extend(page_output_path(*page) for page in pages)
+            precompress(outputs, self.jobs)
+        return len(pages), len(updated) + len(removed)
+
+
+def remove_file(path):
+    for stale in (path, f"{path}.gz"):
+        if os.path.isfile(stale):
+            os.remove(stale)
+
+
+def watch(
+    static_dir,
+    template_path,
+    public_dir,
+    manifest_path,
+    jobs=1,
+    cache=None,
+    compress=False,
+    link=False,
+    collectors=(),
+    watcher=None,
+):
+    build_incremental(
+        static_dir,
+        template_path,
+        public_dir,
+        manifest_path,
+        jobs,
+        cache,
+        link,
+        collectors=collectors,
+    )
+    if compress:
+        precompress_r(public_dir, jobs)
+    rebuilder = Rebuilder(
+        static_dir,
+        template_path,
+        public_dir,
+        manifest_path,
+        jobs,
+        cache,
+        compress,
+        link,
+        collectors,
+    )
+    watcher = watcher or create_watcher(static_dir)
+    print(f"Watching {static_dir} with {type(watcher).__name__}, press Ctrl+C to stop")
+
+    try:
+        while True:
+            changed = watcher.poll()
+            # Editors save in bursts, wait until things settle down
+            while True:
+                more = watcher.poll(DEBOUNCE_SECONDS)
+                if not more:
+                    break
+                changed |= more
+
+            start = time.perf_counter()
+            try:
+                pages, files = rebuilder.rebuild(changed)
+            except Exception as error:
+                print(f"Rebuild failed: {error}")
+                continue
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"Rebuilt {pages} pages and {files} files in {elapsed:.1f} ms")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()